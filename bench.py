@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from details import DetailRenderer
+from registry import ConstantStore
+from search import SearchIndex
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+WORDS = (
+    'proton', 'electron', 'neutron', 'muon', 'deuteron', 'helion', 'alpha', 'tau',
+    'mass', 'charge', 'magnetic', 'moment', 'radius', 'energy', 'ratio', 'length',
+    'frequency', 'wavelength', 'gyromagnetic', 'shielded', 'compton', 'rydberg',
+    'copper', 'silicon', 'water', 'argon', 'thermal', 'conductivity', 'density', 'molar',
+)
+UNITS = ('J', 'kg', 'm', 'J/K', 'C', 'J mol^-1 K^-1', 'W m^-1 K^-1', 'kg m^-3', 'Hz', 'eV', 'Pa', 'm^-1')
+CATEGORIES = ('Physics', 'Chemistry', 'Materials', 'Atomic', 'Nuclear')
+TYPING = ('p', 'pr', 'pro', 'prot', 'proto', 'proton', 'proton ', 'proton m', 'proton ma', 'proton mas')
+
+
+def synthetic_catalog(size, seed=0):
+    # CONSTANTS-style mapping with `size` entries spread over a few categories
+    rng = random.Random(seed)
+    mapping = {category: {} for category in CATEGORIES}
+    for i in range(size):
+        name = ' '.join(rng.sample(WORDS, 3)) + f' {i}'
+        mantissa = rng.uniform(1, 10)
+        value = f'{mantissa:.9f} × 10^{rng.randint(-30, 30)} {rng.choice(UNITS)}'
+        description = f'The {name} used in synthetic benchmark catalogs.'
+        mapping[rng.choice(CATEGORIES)][name] = {'value': value, 'description': description}
+    return mapping
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return {'min_s': min(timings), 'median_s': statistics.median(timings), 'repeat': repeat}
+
+
+def bench_store(size, mapping, repeat):
+    results = {}
+    results['store/build'] = measure(lambda: ConstantStore.from_mapping(mapping), max(1, repeat // 3))
+    store = ConstantStore.from_mapping(mapping)
+    results['search/build-index'] = measure(lambda: SearchIndex(store), max(1, repeat // 3))
+    index = SearchIndex(store)
+
+    def typing():
+        # Same keystroke sequence update_table sees, with incremental narrowing
+        for query in TYPING:
+            index.search(query, 'Physics')
+        index.search('')
+
+    results['search/typing'] = measure(typing, repeat)
+    results['search/fuzzy'] = measure(lambda: index.search('protn mas'), repeat)
+
+    rng = random.Random(1)
+    names = [rng.choice(store.records).name for _ in range(1000)]
+
+    def lookups():
+        for name in names:
+            store.get(name)
+
+    results['lookup/get-1000'] = measure(lookups, repeat)
+    results['lookup/get_many-1000'] = measure(lambda: store.get_many(names), repeat)
+
+    sample = [store.get(name) for name in names]
+
+    def details():
+        # Cold cache, as when the details panel first walks a catalog
+        renderer = DetailRenderer(store)
+        for record in sample:
+            renderer.render(record)
+
+    results['details/render-1000'] = measure(details, repeat)
+    return store, index, results
+
+
+def bench_conversion(store, repeat):
+    from units import compile_conversion, convert_array
+
+    results = {}
+    energies = [r for r in store.records if r.unit_text == 'J']
+    values = [r.value for r in energies]
+
+    def scalar():
+        for value in values:
+            compile_conversion('J', 'eV')(value)
+
+    results['convert/scalar'] = measure(scalar, repeat)
+    try:
+        import numpy
+    except ImportError:
+        return results
+    array = numpy.asarray(values)
+    results['convert/array'] = measure(lambda: convert_array(array, 'J', 'eV'), repeat)
+    mixed_values = numpy.asarray([r.value for r in store.records if r.unit_text in ('J', 'eV')])
+    mixed_units = [r.unit_text for r in store.records if r.unit_text in ('J', 'eV')]
+    results['convert/array-mixed-units'] = measure(lambda: convert_array(mixed_values, mixed_units, 'kJ'), repeat)
+    return results
+
+
+def bench_io(mapping, repeat):
+    from custom_io import iter_entries, write_entries
+
+    results = {}
+    entries = [item for constants in mapping.values() for item in constants.items()]
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in ('json', 'jsonl', 'csv', 'sccat'):
+            path = os.path.join(directory, f'custom.{fmt}')
+
+            def round_trip():
+                write_entries(path, entries, len(entries))
+                for _ in iter_entries(path):
+                    pass
+
+            results[f'io/round-trip-{fmt}'] = measure(round_trip, max(1, repeat // 3))
+    return results
+
+
+def bench_table(store, index, repeat):
+    # Filter-model updates and a repaint, on the offscreen Qt platform
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PyQt5.QtWidgets import QApplication, QTableView
+    except ImportError:
+        return {}
+    from models import ConstantsFilterModel, ConstantsTableModel
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    source = ConstantsTableModel(store)
+    proxy = ConstantsFilterModel()
+    proxy.setSourceModel(source)
+    view = QTableView()
+    view.setModel(proxy)
+    view.resize(1000, 600)
+    view.show()
+    app.processEvents()
+
+    def refresh():
+        for query in TYPING:
+            proxy.set_rows(index.search(query, 'Physics'))
+            view.viewport().repaint()
+        proxy.set_rows(index.search(''))
+        view.viewport().repaint()
+        app.processEvents()
+
+    results = {'table/typing-refresh': measure(refresh, repeat)}
+    view.close()
+    return results
+
+
+def run(sizes, repeat, include_io=True):
+    results = {}
+    for size in sizes:
+        mapping = synthetic_catalog(size)
+        store, index, store_results = bench_store(size, mapping, repeat)
+        store_results.update(bench_conversion(store, repeat))
+        store_results.update(bench_table(store, index, repeat))
+        if include_io:
+            store_results.update(bench_io(mapping, repeat))
+        for name, timing in store_results.items():
+            results[f'{name}@{size}'] = timing
+        print(f'{size:>8} entries: {len(store_results)} benchmarks', file=sys.stderr)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'sizes': list(sizes),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    # Names of benchmarks whose median is more than `tolerance` times the baseline
+    regressions = []
+    for name, timing in sorted(report['results'].items()):
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = timing['median_s'] / base['median_s'] if base['median_s'] else 1.0
+        marker = 'REGRESSION' if ratio > tolerance else ''
+        print(f'{name:<45} {base["median_s"] * 1000:10.3f} ms -> {timing["median_s"] * 1000:10.3f} ms  x{ratio:5.2f} {marker}')
+        if ratio > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark search, table refresh, import/export, lookup and conversion.')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma separated catalog sizes, e.g. 1000,10000,1000000')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-io', action='store_true', help='skip import/export round trips')
+    parser.add_argument('-o', '--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against a previously saved results file')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='slowdown factor over the baseline that counts as a regression')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    report = run(sizes, args.repeat, include_io=not args.skip_io)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        for name, timing in report['results'].items():
+            print(f'{name:<45} {timing["median_s"] * 1000:10.3f} ms')
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        if regressions:
+            print(f'{len(regressions)} benchmark(s) regressed beyond x{args.tolerance}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
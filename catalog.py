@@ -0,0 +1,259 @@
+import math
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+from files import atomic_write
+from registry import parse_value
+
+# Binary catalog layout (little-endian):
+#   header      HEADER
+#   categories  CATEGORY * category_count   (each category is a contiguous shard of entries)
+#   entries     ENTRY * entry_count         (fixed width, grouped by category)
+#   name index  uint32 * entry_count        (entry numbers sorted by casefolded name)
+#   heap        UTF-8 strings, deduplicated; offsets are relative to the heap start
+MAGIC = b'SCCAT\x00\x01\x00'
+HEADER = struct.Struct('<8sIIQQQQ')
+CATEGORY = struct.Struct('<IIII')
+ENTRY = struct.Struct('<IIIIIIIIdd')
+NAME_INDEX = struct.Struct('<I')
+EXTENSION = '.sccat'
+
+
+class CatalogError(ValueError):
+    pass
+
+
+class CatalogEntry:
+    __slots__ = ('category', 'name', 'text', 'description', 'unit', 'value', 'uncertainty')
+
+    def __init__(self, category, name, text, description, unit, value, uncertainty):
+        self.category = category
+        self.name = name
+        self.text = text
+        self.description = description
+        self.unit = unit
+        self.value = value
+        self.uncertainty = uncertainty
+
+    def __repr__(self):
+        return f'CatalogEntry({self.category!r}, {self.name!r}, {self.text!r})'
+
+    def as_dict(self):
+        return {'value': self.text, 'description': self.description}
+
+
+class _Heap:
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+        self.offsets = {}
+
+    def add(self, text):
+        # Identical strings (e.g. a constant shared by two categories) are stored once
+        found = self.offsets.get(text)
+        if found is not None:
+            return found
+        data = text.encode('utf-8')
+        found = (self.size, len(data))
+        self.offsets[text] = found
+        self.chunks.append(data)
+        self.size += len(data)
+        return found
+
+
+def build_catalog(mapping, columns=False):
+    # Encode a CONSTANTS-style {category: {name: {'value', 'description'}}}
+    # mapping in the binary catalog layout, as a list of byte chunks. With
+    # `columns`, returns (chunks, values, uncertainties) where the float64
+    # arrays hold what Catalog.columns() would read back.
+    heap = _Heap()
+    values = array('d')
+    uncertainties = array('d')
+    categories = []
+    entries = []
+    sort_keys = []
+    for category, constants in mapping.items():
+        first = len(entries)
+        for name, data in constants.items():
+            text = data['value']
+            description = data.get('description', '')
+            parsed = parse_value(text)
+            if parsed is None:
+                value, uncertainty, unit = math.nan, math.nan, ''
+            else:
+                mantissa, exponent, uncertainty, unit_obj = parsed
+                value, unit = float(mantissa.scaleb(exponent)), unit_obj.symbol
+            entries.append(ENTRY.pack(
+                *heap.add(name), *heap.add(text), *heap.add(description), *heap.add(unit),
+                value, uncertainty,
+            ))
+            if columns:
+                values.append(value)
+                uncertainties.append(uncertainty)
+            sort_keys.append(name.casefold())
+        categories.append(CATEGORY.pack(*heap.add(category), first, len(entries) - first))
+
+    name_index = sorted(range(len(entries)), key=sort_keys.__getitem__)
+    category_offset = HEADER.size
+    entry_offset = category_offset + CATEGORY.size * len(categories)
+    index_offset = entry_offset + ENTRY.size * len(entries)
+    heap_offset = index_offset + NAME_INDEX.size * len(entries)
+
+    header = HEADER.pack(MAGIC, len(categories), len(entries),
+                         category_offset, entry_offset, index_offset, heap_offset)
+    chunks = [header, *categories, *entries, struct.pack(f'<{len(name_index)}I', *name_index), *heap.chunks]
+    return (chunks, values, uncertainties) if columns else chunks
+
+
+def write_catalog(path, mapping):
+    # Write `mapping` as a binary catalog file, replaced atomically
+    chunks = build_catalog(mapping)
+    with atomic_write(path, fsync=True) as file:
+        file.writelines(chunks)
+
+
+class Catalog:
+    # Read-only view of a binary catalog. The file is memory-mapped and only
+    # the header and category table are read up front; entries and strings
+    # are decoded when they are accessed, so the OS pages in only what is used.
+    def __init__(self, path, buffer=None):
+        # `buffer` reads an already mapped catalog (e.g. shared memory) instead of `path`
+        self.path = path
+        if buffer is None:
+            with open(path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size < HEADER.size:
+                    raise CatalogError(f"'{path}' is not a constants catalog")
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        elif len(buffer) < HEADER.size:
+            raise CatalogError(f"'{path}' is not a constants catalog")
+        else:
+            self._map = buffer
+        (magic, self._category_count, self._entry_count, category_offset,
+         self._entry_offset, self._index_offset, self._heap_offset) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise CatalogError(f"'{path}' is not a constants catalog")
+
+        self._categories = {}
+        self._shards = []
+        self._shard_starts = []
+        for i in range(self._category_count):
+            name_off, name_len, first, count = CATEGORY.unpack_from(self._map, category_offset + i * CATEGORY.size)
+            name = self._string(name_off, name_len)
+            self._categories[name] = (first, count)
+            self._shards.append(name)
+            self._shard_starts.append(first)
+
+    def close(self):
+        # Buffers passed in are released; the caller still owns what backs them
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        elif isinstance(self._map, memoryview):
+            self._map.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._entry_count
+
+    def _string(self, offset, length):
+        start = self._heap_offset + offset
+        return str(self._map[start:start + length], 'utf-8')
+
+    def _name(self, number):
+        name_off, name_len = struct.unpack_from('<II', self._map, self._entry_offset + number * ENTRY.size)
+        return self._string(name_off, name_len)
+
+    def _category_of(self, number):
+        position = bisect_left(self._shard_starts, number + 1) - 1
+        return self._shards[position]
+
+    def entry(self, number, category=None):
+        fields = ENTRY.unpack_from(self._map, self._entry_offset + number * ENTRY.size)
+        string = self._string
+        return CatalogEntry(
+            category if category is not None else self._category_of(number),
+            string(fields[0], fields[1]),
+            string(fields[2], fields[3]),
+            string(fields[4], fields[5]),
+            string(fields[6], fields[7]),
+            fields[8],
+            fields[9],
+        )
+
+    def categories(self):
+        return list(self._categories)
+
+    def columns(self):
+        # (values, uncertainties) of every entry, in entry order, as float64 arrays
+        values = array('d')
+        uncertainties = array('d')
+        entries = self._map[self._entry_offset:self._entry_offset + self._entry_count * ENTRY.size]
+        for fields in ENTRY.iter_unpack(entries):
+            values.append(fields[8])
+            uncertainties.append(fields[9])
+        return values, uncertainties
+
+    def category(self, category):
+        # Entries of one shard, decoded lazily as the iterator advances
+        first, count = self._categories[category]
+        for number in range(first, first + count):
+            yield self.entry(number, category)
+
+    def __iter__(self):
+        for category in self._categories:
+            yield from self.category(category)
+
+    def _sorted_name(self, position):
+        number = NAME_INDEX.unpack_from(self._map, self._index_offset + position * NAME_INDEX.size)[0]
+        return number, self._name(number)
+
+    def get(self, name, category=None, default=None):
+        # Binary search on the name index, O(log n) decoded names per lookup
+        key = name.casefold()
+        low, high = 0, self._entry_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._sorted_name(middle)[1].casefold() < key:
+                low = middle + 1
+            else:
+                high = middle
+        fallback = None
+        while low < self._entry_count:
+            number, found = self._sorted_name(low)
+            if found.casefold() != key:
+                break
+            entry = self.entry(number)
+            if category is None or entry.category == category:
+                if found == name:
+                    return entry
+                fallback = fallback or entry
+            low += 1
+        return fallback if fallback is not None else default
+
+    def to_mapping(self):
+        mapping = {}
+        for entry in self:
+            mapping.setdefault(entry.category, {})[entry.name] = entry.as_dict()
+        return mapping
+
+
+def open_catalog(path):
+    return Catalog(path)
+
+
+def is_catalog(path):
+    if path.endswith(EXTENSION):
+        return True
+    try:
+        with open(path, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
@@ -0,0 +1,120 @@
+import time
+
+from PyQt5.QtCore import QPointF, QRectF, Qt, QTimer
+from PyQt5.QtGui import QPainter, QPen, QPolygonF
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+
+MARGIN_LEFT = 48
+MARGIN_RIGHT = 12
+MARGIN_TOP = 12
+MARGIN_BOTTOM = 28
+# New data is drawn at most this often, however fast events arrive
+REDRAW_INTERVAL_MS = 250
+
+
+class TimeSeriesChart(QWidget):
+    # Plots a series supplied by `fetch(start, end, width)`, which must return
+    # (xs, ys) already downsampled to about `width` points. The chart only
+    # asks again when the range, the plot width or the data changes, so a
+    # repaint never costs more than drawing `width` points.
+    def __init__(self, fetch=None, style='bars', parent=None):
+        super().__init__(parent)
+        self.fetch = fetch
+        self.style = style
+        self.start = self.end = 0.0
+        self.time_axis = True
+        self.y_label = ''
+        self._points = None
+        self._fetched_width = 0
+        self._redraw = QTimer(self)
+        self._redraw.setSingleShot(True)
+        self._redraw.setInterval(REDRAW_INTERVAL_MS)
+        self._redraw.timeout.connect(self.update)
+        self.setMinimumSize(320, 200)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+    def set_fetch(self, fetch, style=None):
+        self.fetch = fetch
+        if style is not None:
+            self.style = style
+        self.invalidate(immediate=True)
+
+    def set_range(self, start, end):
+        self.start, self.end = start, end
+        self.invalidate(immediate=True)
+
+    def invalidate(self, immediate=False):
+        # Mark the data stale; repeated calls within the interval share a redraw
+        self._points = None
+        if immediate:
+            self.update()
+        elif not self._redraw.isActive():
+            self._redraw.start()
+
+    def plot_rect(self):
+        return QRectF(MARGIN_LEFT, MARGIN_TOP,
+                      max(1, self.width() - MARGIN_LEFT - MARGIN_RIGHT),
+                      max(1, self.height() - MARGIN_TOP - MARGIN_BOTTOM))
+
+    def _series(self, width):
+        if self._points is None or self._fetched_width != width:
+            self._fetched_width = width
+            self._points = self.fetch(self.start, self.end, width) if self.fetch and self.end > self.start else ([], [])
+        return self._points
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing, self.style == 'line')
+        rect = self.plot_rect()
+        xs, ys = self._series(int(rect.width()))
+
+        painter.setPen(QPen(self.palette().mid().color()))
+        painter.drawRect(rect)
+        if not xs:
+            painter.setPen(self.palette().text().color())
+            painter.drawText(rect, Qt.AlignCenter, 'No data in this range')
+            return
+
+        low = 0.0 if self.style == 'bars' else min(ys)
+        high = max(ys)
+        if high == low:
+            high = low + (abs(low) or 1.0)
+        x_scale = rect.width() / (self.end - self.start)
+        y_scale = rect.height() / (high - low)
+
+        def point(x, y):
+            return QPointF(rect.left() + (x - self.start) * x_scale, rect.bottom() - (y - low) * y_scale)
+
+        painter.setPen(QPen(self.palette().highlight().color(), 1.5 if self.style == 'line' else 1))
+        if self.style == 'bars':
+            for x, y in zip(xs, ys):
+                top = point(x, y)
+                painter.drawLine(QPointF(top.x(), rect.bottom()), top)
+        else:
+            painter.drawPolyline(QPolygonF([point(x, y) for x, y in zip(xs, ys)]))
+            for x, y in zip(xs, ys):
+                painter.drawEllipse(point(x, y), 2, 2)
+
+        painter.setPen(self.palette().text().color())
+        metrics = painter.fontMetrics()
+        painter.drawText(QRectF(0, rect.top() - 6, MARGIN_LEFT - 4, metrics.height()),
+                         Qt.AlignRight, f'{high:.6g}')
+        painter.drawText(QRectF(0, rect.bottom() - metrics.height() + 6, MARGIN_LEFT - 4, metrics.height()),
+                         Qt.AlignRight, f'{low:.6g}')
+        label_rect = QRectF(rect.left(), rect.bottom() + 4, rect.width(), metrics.height())
+        painter.drawText(label_rect, Qt.AlignLeft, self._axis_label(self.start))
+        painter.drawText(label_rect, Qt.AlignRight, self._axis_label(self.end))
+        if self.y_label:
+            painter.drawText(label_rect, Qt.AlignHCenter, self.y_label)
+
+    def _axis_label(self, x):
+        if not self.time_axis:
+            return f'{x:g}'
+        span = self.end - self.start
+        fmt = '%H:%M' if span <= 86400 else '%Y-%m-%d'
+        return time.strftime(fmt, time.localtime(x))
+
+    def resizeEvent(self, event):
+        # A new width needs a new downsampling; the cached points are reused otherwise
+        self._points = None
+        super().resizeEvent(event)
@@ -0,0 +1,309 @@
+import argparse
+import importlib
+import json
+import math
+import sys
+
+from registry import default_store
+from units import UnitError, compile_conversion
+
+BATCH_SIZE = 1024
+FIELDS = ('name', 'value', 'uncertainty', 'unit', 'text', 'categories')
+# Defaults for `serve`; kept here so building the parser does not import
+# the server (and asyncio) for every other command
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+def read_names(names, path):
+    # Names from the command line, a file, or stdin (one per line), lazily
+    if names:
+        yield from names
+        return
+    stream = open(path, encoding='utf-8') if path and path != '-' else sys.stdin
+    try:
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def batches(items, size=BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def record_row(record):
+    return {
+        'name': record.name,
+        'value': None if math.isnan(record.value) else record.value,
+        'uncertainty': None if math.isnan(record.uncertainty) else record.uncertainty,
+        'unit': record.unit_text,
+        'text': record.text,
+        'categories': sorted(record.categories),
+    }
+
+
+class RowWriter:
+    # Streams rows as JSON lines or CSV, flushing after every batch
+    def __init__(self, stream, fmt, fields):
+        self.stream = stream
+        self.fmt = fmt
+        self.fields = fields
+        if fmt == 'csv':
+            import csv
+            self.csv = csv.writer(stream, lineterminator='\n')
+            self.csv.writerow(fields)
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self.csv.writerow(
+                ';'.join(value) if isinstance(value, list) else ('' if value is None else value)
+                for value in (row.get(field) for field in self.fields)
+            )
+        else:
+            self.stream.write(json.dumps(row, ensure_ascii=False))
+            self.stream.write('\n')
+
+    def flush(self):
+        self.stream.flush()
+
+
+def resolve(args, store, writer, convert=None):
+    missing = 0
+    for batch in batches(read_names(args.names, args.file)):
+        for name, record in zip(batch, store.get_many(batch, args.category)):
+            if record is None:
+                missing += 1
+                writer.write({'name': name, 'error': 'not found'})
+                continue
+            row = record_row(record)
+            if convert is not None:
+                try:
+                    convert(record, row)
+                except UnitError as e:
+                    missing += 1
+                    row = {'name': name, 'error': str(e)}
+            writer.write(row)
+        writer.flush()
+    return 1 if missing and args.strict else 0
+
+
+def cmd_query(args, store, out):
+    writer = RowWriter(out, args.format, FIELDS + ('error',))
+    return resolve(args, store, writer)
+
+
+def cmd_convert(args, store, out):
+    def convert(record, row):
+        if record.unit is None:
+            raise UnitError(f"'{record.name}' has no numeric value")
+        conversion = compile_conversion(record.unit_text, args.to)
+        row['value'] = conversion(record.value)
+        row['uncertainty'] = record.uncertainty * conversion.factor
+        row['unit'] = args.to
+
+    writer = RowWriter(out, args.format, FIELDS + ('error',))
+    return resolve(args, store, writer, convert)
+
+
+def cmd_export(args, store, out):
+    writer = RowWriter(out, args.format, FIELDS + ('description',))
+    records = store.category(args.category) if args.category else store
+    for record in records:
+        row = record_row(record)
+        row['description'] = record.description
+        writer.write(row)
+    writer.flush()
+    return 0
+
+
+def cmd_diff(args, store, out):
+    from releases import ReleaseStore
+
+    writer = RowWriter(out, args.format, ('name', 'old', 'new', 'old_uncertainty', 'new_uncertainty', 'change'))
+    for name, (old, new) in ReleaseStore(store).diff(args.old, args.new).items():
+        row = {'name': name, 'old': old and old.text, 'new': new and new.text}
+        if old is not None and new is not None and old.numeric and new.numeric:
+            row['old_uncertainty'] = old.uncertainty
+            row['new_uncertainty'] = new.uncertainty
+            row['change'] = (new.value - old.value) / old.value if old.value else None
+        writer.write(row)
+    writer.flush()
+    return 0
+
+
+def cmd_eval(args, store, out):
+    from expr import DEFAULT_PRECISION, ExpressionError, compile_expression
+
+    writer = RowWriter(out, args.format, ('expression', 'value', 'uncertainty', 'unit', 'error'))
+    values = dict(args.var or ())
+    failed = 0
+    for expression in args.expressions:
+        try:
+            plan = compile_expression(expression)
+            result = plan.evaluate(store, args.mode, args.precision or DEFAULT_PRECISION, values)
+            row = {'expression': expression}
+            if args.mode == 'uncertainty':
+                row['value'], row['uncertainty'] = result.value, result.uncertainty
+            else:
+                # Decimal and mpmath results are written as text to keep every digit
+                row['value'] = result if isinstance(result, float) else str(result)
+        except (ExpressionError, ArithmeticError) as e:
+            failed += 1
+            row = {'expression': expression, 'error': str(e)}
+        else:
+            # A value whose unit cannot be written (e.g. sqrt(G) has
+            # fractional dimensions) is still a result; the unit stays empty
+            if not values:
+                try:
+                    row['unit'] = plan.unit(store).symbol
+                except (ExpressionError, ArithmeticError):
+                    pass
+        writer.write(row)
+    writer.flush()
+    return 1 if failed and args.strict else 0
+
+
+def cmd_check(args, store, out):
+    from graph import ConstantGraph
+
+    writer = RowWriter(out, args.format, ('name', 'formula', 'value', 'computed', 'deviation', 'consistent', 'error'))
+    failed = 0
+    for check in ConstantGraph(store).check():
+        row = {'name': check.name, 'formula': check.formula, 'consistent': check.consistent}
+        if check.error is not None:
+            row['error'] = check.error
+        else:
+            row.update(value=check.expected, computed=check.computed, deviation=check.deviation)
+        failed += not check.consistent
+        writer.write(row)
+    writer.flush()
+    return 1 if failed and args.strict else 0
+
+
+def cmd_serve(args, store, out):
+    from server import serve
+    return serve(store, host=args.host, port=args.port)
+
+
+def assignment(text):
+    # argparse type for NAME=VALUE with a numeric value
+    name, equals, value = text.partition('=')
+    name = name.strip()
+    try:
+        if not name or not equals:
+            raise ValueError
+        return name, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME=NUMBER, got '{text}'") from None
+
+
+def precision(text):
+    # argparse type for eval --precision, bounded by expr.MAX_PRECISION
+    from expr import ExpressionError, check_precision
+
+    try:
+        return check_precision(int(text))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e) if isinstance(e, ExpressionError) else f"invalid int value: '{text}'")
+
+
+def lazy_choice(module, name):
+    # argparse type that checks a value against the tuple `name` of
+    # `module`, importing the module only when the argument is parsed
+    def check(value):
+        choices = getattr(importlib.import_module(module), name)
+        if value not in choices:
+            raise argparse.ArgumentTypeError(f"invalid choice: '{value}' (choose from {', '.join(choices)})")
+        return value
+    return check
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m constants',
+        description='Look up, convert and export scientific constants without the GUI.',
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_lookup_arguments(command):
+        command.add_argument('names', nargs='*', help='constant names; read from --file or stdin when omitted')
+        command.add_argument('-f', '--file', help="file with one name per line ('-' for stdin)")
+        command.add_argument('-c', '--category', help='only match constants in this category')
+        command.add_argument('--strict', action='store_true', help='exit with status 1 if any name fails')
+
+    query = commands.add_parser('query', help='resolve constant names to values')
+    add_lookup_arguments(query)
+    query.set_defaults(handler=cmd_query)
+
+    convert = commands.add_parser('convert', help='resolve constants and convert them to a unit')
+    add_lookup_arguments(convert)
+    convert.add_argument('-t', '--to', required=True, help="target unit, e.g. 'kJ/mol' or 'eV/K'")
+    convert.set_defaults(handler=cmd_convert)
+
+    export = commands.add_parser('export', help='dump the catalog')
+    export.add_argument('-c', '--category', help='only export this category')
+    export.set_defaults(handler=cmd_export)
+
+    release = lazy_choice('releases', 'RELEASES')
+
+    diff = commands.add_parser('diff', help='list constants whose value changed between two CODATA releases')
+    diff.add_argument('old', type=release, help='CODATA release, e.g. 2018')
+    diff.add_argument('new', type=release, help='CODATA release, e.g. 2022')
+    diff.set_defaults(handler=cmd_diff)
+
+    evaluate = commands.add_parser('eval', help="evaluate expressions over constants, e.g. 'h*c/k_B'")
+    evaluate.add_argument('expressions', nargs='+')
+    evaluate.add_argument('-m', '--mode', type=lazy_choice('expr', 'MODES'), default='float',
+                          help="float, decimal, mpmath or uncertainty; 'uncertainty' propagates the constants' "
+                               "standard uncertainties")
+    evaluate.add_argument('-p', '--precision', type=precision,
+                          help='significant digits in decimal and mpmath modes')
+    evaluate.add_argument('--var', action='append', type=assignment, metavar='NAME=VALUE',
+                          help='extra input, e.g. T=300')
+    evaluate.add_argument('--strict', action='store_true', help='exit with status 1 if any expression fails')
+    evaluate.set_defaults(handler=cmd_eval)
+
+    check = commands.add_parser('check', help='compare constants with the formulas that define them, e.g. R = N_A*k_B')
+    check.add_argument('--strict', action='store_true', help='exit with status 1 if any constant is inconsistent')
+    check.set_defaults(handler=cmd_check)
+
+    server = commands.add_parser('serve', help='answer lookups, searches and conversions over HTTP/JSON')
+    server.add_argument('--host', default=DEFAULT_HOST)
+    server.add_argument('--port', type=int, default=DEFAULT_PORT)
+    server.set_defaults(handler=cmd_serve)
+
+    for command in (query, convert, export, evaluate, check):
+        command.add_argument('-r', '--release', type=release,
+                             help='use values as of this CODATA release instead of the built-in catalog')
+    for command in (query, convert, export, diff, evaluate, check):
+        command.add_argument('--format', choices=('jsonl', 'csv'), default='jsonl')
+    return parser
+
+
+def main(argv=None, out=None):
+    args = build_parser().parse_args(argv)
+    out = out or sys.stdout
+    store = default_store()
+    if getattr(args, 'release', None):
+        from releases import ReleaseStore
+        store = ReleaseStore(store).view(args.release)
+    try:
+        return args.handler(args, store, out)
+    except BrokenPipeError:
+        # Downstream consumer (e.g. `head`) closed the pipe early
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
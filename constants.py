@@ -142,3 +142,20 @@ CONSTANTS = {
         },
     }
 }
+
+
+def __getattr__(name):
+    # The parsed store is built on first access so importing CONSTANTS stays cheap
+    if name == 'STORE':
+        from registry import default_store
+        return default_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == '__main__':
+    import sys
+    from cli import main
+
+    # Let `import constants` inside the CLI reuse this module instead of loading it twice
+    sys.modules.setdefault('constants', sys.modules[__name__])
+    sys.exit(main())
@@ -0,0 +1,295 @@
+import codecs
+import csv
+import json
+import os
+
+from catalog import EXTENSION as CATALOG_EXTENSION, is_catalog, open_catalog, write_catalog
+from files import atomic_write
+
+CHUNK_SIZE = 1 << 16
+CUSTOM_CATEGORY = 'Custom'
+CSV_FIELDS = ('name', 'value', 'description')
+FORMATS = ('json', 'jsonl', 'csv', 'sccat')
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def _csv_dialect(path):
+    return 'excel-tab' if path.lower().endswith('.tsv') else 'excel'
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == CATALOG_EXTENSION:
+        return 'sccat'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if extension in ('.csv', '.tsv'):
+        return 'csv'
+    return 'json'
+
+
+class _Progress:
+    # Reports whole-percent progress and checks for cancellation, at most once per percent
+    def __init__(self, total, progress, cancelled):
+        self.total = max(total, 1)
+        self.progress = progress
+        self.cancelled = cancelled
+        self.last = -1
+
+    def update(self, done):
+        if self.cancelled is not None and self.cancelled():
+            raise ImportCancelled()
+        percent = min(100, done * 100 // self.total)
+        if percent != self.last and self.progress is not None:
+            self.last = percent
+            self.progress(percent)
+
+
+class _ByteCounter:
+    # Wraps a binary file so text readers on top of it can report bytes consumed
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.count += len(data)
+        return data
+
+    def readline(self, size=-1):
+        data = self.file.readline(size)
+        self.count += len(data)
+        return data
+
+    def __iter__(self):
+        for line in self.file:
+            self.count += len(line)
+            yield line
+
+
+def _entry(name, data, where):
+    if not isinstance(data, dict) or 'value' not in data:
+        raise ImportFormatError(f"Constant '{name}' in {where} has no 'value'")
+    return name, {'value': str(data['value']), 'description': str(data.get('description') or '')}
+
+
+class _JSONReader:
+    # Incremental scanner over a JSON document read in chunks. Objects are
+    # walked member by member, so nested objects (a category of constants)
+    # never have to be decoded, or held in memory, as a whole.
+    def __init__(self, file):
+        self.file = file
+        self.decoder = json.JSONDecoder()
+        self.reader = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.fill()
+
+    def fill(self, size=CHUNK_SIZE):
+        chunk = self.file.read(size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + self.reader.decode(chunk, final=self.eof)
+        self.pos = 0
+
+    def peek(self):
+        # The next non-whitespace character, or '' at the end of input
+        while True:
+            buffer, pos = self.buffer, self.pos
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            self.pos = pos
+            if pos < len(buffer) or self.eof:
+                return buffer[pos:pos + 1]
+            self.fill()
+
+    def expect(self, *tokens):
+        token = self.peek()
+        if not token or token not in tokens:
+            raise ImportFormatError(f"Expected {' or '.join(map(repr, tokens))} in JSON input")
+        self.pos += 1
+        return token
+
+    def decode(self):
+        # One complete value. When it runs past the buffer, at least as much
+        # again is read before retrying, so a large value is re-scanned a
+        # logarithmic number of times rather than once per chunk.
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.fill(max(CHUNK_SIZE, len(self.buffer) - self.pos))
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # A number may continue in the next chunk
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+    def members(self):
+        # Keys of the object starting here; the caller reads each value
+        # (decode() or a nested members()) before asking for the next key
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.decode()
+            if not isinstance(key, str):
+                raise ImportFormatError('JSON object keys must be strings')
+            self.expect(':')
+            yield key
+            if self.expect(',', '}') == '}':
+                return
+
+
+def _iter_json_entries(reader, path, tracker, counter):
+    # {name: {...}} or CONSTANTS-style {category: {name: {...}}}. An object
+    # whose first member is itself an object is taken to be a category.
+    for key in reader.members():
+        if reader.peek() != '{':
+            yield _entry(key, reader.decode(), path)
+            tracker.update(counter.count)
+            continue
+        fields = {}
+        category = None
+        for name in reader.members():
+            if category is None:
+                category = name != 'value' and reader.peek() == '{'
+            if category:
+                yield _entry(name, reader.decode(), path)
+                tracker.update(counter.count)
+            else:
+                fields[name] = reader.decode()
+        if category is False:
+            yield _entry(key, fields, path)
+            tracker.update(counter.count)
+
+
+def iter_entries(path, progress=None, cancelled=None):
+    # Stream (name, {'value', 'description'}) pairs out of a JSON, JSON Lines,
+    # CSV or binary catalog file. Progress is reported in percent of bytes read.
+    fmt = 'sccat' if is_catalog(path) else file_format(path)
+    if fmt == 'sccat':
+        with open_catalog(path) as catalog:
+            tracker = _Progress(len(catalog), progress, cancelled)
+            for done, entry in enumerate(catalog, 1):
+                yield entry.name, entry.as_dict()
+                tracker.update(done)
+        return
+
+    tracker = _Progress(os.path.getsize(path), progress, cancelled)
+    with open(path, 'rb') as raw:
+        counter = _ByteCounter(raw)
+        if fmt == 'json':
+            yield from _iter_json_entries(_JSONReader(counter), path, tracker, counter)
+        elif fmt == 'jsonl':
+            for number, line in enumerate(counter, 1):
+                line = line.strip()
+                if line:
+                    item = json.loads(line)
+                    if not isinstance(item, dict):
+                        raise ImportFormatError(f"Line {number} of {path} is not an object")
+                    if 'name' not in item:
+                        raise ImportFormatError(f"Line {number} of {path} has no 'name'")
+                    yield _entry(item['name'], item, f'line {number}')
+                tracker.update(counter.count)
+        else:
+            text = codecs.getreader('utf-8-sig')(counter)
+            for number, row in enumerate(csv.DictReader(text, dialect=_csv_dialect(path)), 2):
+                if not row.get('name'):
+                    raise ImportFormatError(f"Row {number} of {path} has no 'name'")
+                yield _entry(row['name'], row, f'row {number}')
+                tracker.update(counter.count)
+    if progress is not None:
+        progress(100)
+
+
+def write_entries(path, entries, count=None, progress=None, cancelled=None):
+    # Stream (name, data) pairs to `path` in the format its extension names.
+    # Output goes to a temporary file that replaces `path` only on success.
+    fmt = file_format(path)
+    tracker = _Progress(count or 0, progress, cancelled)
+    if fmt == 'sccat':
+        def tracked():
+            for done, entry in enumerate(entries, 1):
+                if count:
+                    tracker.update(done)
+                yield entry
+
+        write_catalog(path, {CUSTOM_CATEGORY: dict(tracked())})
+        if progress is not None:
+            progress(100)
+        return
+
+    with atomic_write(path, 'w', encoding='utf-8', newline='', fsync=True) as file:
+        if fmt == 'csv':
+            writer = csv.writer(file, dialect=_csv_dialect(path))
+            writer.writerow(CSV_FIELDS)
+        elif fmt == 'json':
+            file.write('{')
+        for done, (name, data) in enumerate(entries, 1):
+            if fmt == 'csv':
+                writer.writerow((name, data['value'], data.get('description', '')))
+            elif fmt == 'jsonl':
+                file.write(json.dumps({'name': name, **data}, ensure_ascii=False))
+                file.write('\n')
+            else:
+                file.write(',\n' if done > 1 else '\n')
+                file.write(json.dumps(name, ensure_ascii=False))
+                file.write(': ')
+                file.write(json.dumps(data, ensure_ascii=False))
+            if count:
+                tracker.update(done)
+        if fmt == 'json':
+            file.write('\n}\n')
+    if progress is not None:
+        progress(100)
+
+
+class MergeReport:
+    # Outcome of merging imported constants into an existing set. Nothing is
+    # applied until apply() runs, so a cancelled or failed import leaves the
+    # existing set untouched.
+    def __init__(self):
+        self.added = {}
+        self.conflicts = {}
+        self.unchanged = 0
+
+    def __len__(self):
+        return len(self.added) + len(self.conflicts) + self.unchanged
+
+    def apply(self, target, replace_conflicts=False):
+        target.update(self.added)
+        if replace_conflicts:
+            target.update((name, new) for name, (_, new) in self.conflicts.items())
+
+    def summary(self):
+        return (f"{len(self.added)} added, {self.unchanged} unchanged, "
+                f"{len(self.conflicts)} conflicting with existing constants")
+
+
+def merge_entries(existing, entries):
+    # Compare incoming entries against `existing` (read only) as they stream in
+    report = MergeReport()
+    for name, data in entries:
+        current = existing.get(name)
+        if current is None:
+            report.added[name] = data
+        elif current == data:
+            report.unchanged += 1
+        else:
+            report.conflicts[name] = (current, data)
+    return report
@@ -0,0 +1,98 @@
+import math
+from collections import OrderedDict
+from html import escape
+
+import perf
+
+DETAIL_CACHE_SIZE = 512
+
+
+class DetailRenderer:
+    # Rich-text detail pages for the details panel, rendered once per record
+    # and kept in an LRU cache. Records are immutable (an update replaces the
+    # record object), so a cached page can only go stale through its related
+    # constants; call invalidate() with the changed records after changing
+    # the store.
+    #
+    # `related(record)` returns [(record, note)] for the "Related" section;
+    # by default it comes from a graph.ConstantGraph of the store.
+    # `translate` is a gettext-style callable for labels, names and descriptions.
+    def __init__(self, store, related=None, translate=None, cache_size=DETAIL_CACHE_SIZE):
+        self.store = store
+        self._related = related
+        self.translate = translate
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._graph = None
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            from graph import ConstantGraph
+            self._graph = ConstantGraph(self.store)
+        return self._graph
+
+    def invalidate(self, records=None, removed=()):
+        # Drop cached pages. With the records added or rewritten (and the ids
+        # retired) the graph is updated in place; without, it is rebuilt on
+        # next use.
+        self._cache.clear()
+        if records is None:
+            self._graph = None
+        elif self._graph is not None:
+            self._graph.update(records, removed)
+
+    def render(self, record):
+        html = self._cache.get(record)
+        if html is not None:
+            self._cache.move_to_end(record)
+            return html
+        perf.count('details rendered')
+        html = self._cache[record] = self._render(record)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return html
+
+    def set_translate(self, translate):
+        # Pages are rendered in the active language, so switching drops them
+        self.translate = translate
+        self._cache.clear()
+
+    def _render(self, record):
+        _ = self.translate or str
+        rows = [(_('Value'), escape(record.text))]
+        if record.numeric:
+            rows.append((_('Numeric value'), f'{record.value:.12g}'))
+            rows.append((_('Uncertainty'), _uncertainty(record, _)))
+            if record.unit is not None and not record.unit.dimensionless:
+                unit = escape(record.unit_text)
+                si = escape(record.unit.dimension_string())
+                rows.append((_('Units'), unit if unit == si else f'{unit} ({si})'))
+        categories = ', '.join(sorted(map(_, record.categories)))
+        rows.append((_('Categories'), escape(categories) or '&mdash;'))
+
+        parts = [f'<h3>{escape(_(record.name))}</h3>']
+        if record.description:
+            parts.append(f'<p>{escape(_(record.description))}</p>')
+        parts.append('<table cellspacing="0" cellpadding="2">')
+        parts.extend(f'<tr><td><b>{escape(label)}</b>&nbsp;&nbsp;</td><td>{value}</td></tr>' for label, value in rows)
+        parts.append('</table>')
+
+        related = (self._related or self.graph.related)(record)
+        if related:
+            parts.append(f'<p><b>{escape(_("Related"))}</b></p><ul>')
+            parts.extend(f'<li>{escape(_(other.name))} &mdash; {escape(note)}</li>' for other, note in related)
+            parts.append('</ul>')
+        return ''.join(parts)
+
+
+def _uncertainty(record, _):
+    uncertainty = record.uncertainty
+    if math.isnan(uncertainty):
+        return '&mdash;'
+    if uncertainty == 0:
+        return escape(_('exact'))
+    text = f'{uncertainty:.2g} {escape(record.unit_text)}'.rstrip()
+    if record.value:
+        text += f' ({escape(_("relative"))} {uncertainty / abs(record.value):.1e})'
+    return text
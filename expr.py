@@ -0,0 +1,450 @@
+import ast
+import math
+from decimal import Decimal, localcontext
+from functools import lru_cache
+
+from registry import PI, default_store
+from units import DIMENSIONLESS, Unit, parse_unit
+
+MODES = ('float', 'decimal', 'mpmath', 'uncertainty')
+DEFAULT_PRECISION = 50
+# Significant digits beyond this are refused: decimal and mpmath work at
+# that precision holds the GIL for the whole call
+MAX_PRECISION = 5000
+# Longer expressions are rejected before parsing
+MAX_EXPRESSION_LENGTH = 1000
+FUNCTIONS = ('sqrt', 'exp', 'log', 'log10', 'sin', 'cos', 'tan')
+
+# Short symbols for catalog names
+ALIASES = {
+    'c': 'Speed of Light',
+    'G': 'Gravitational Constant',
+    'h': 'Planck\'s Constant',
+    'k_B': 'Boltzmann Constant',
+    'k': 'Boltzmann Constant',
+    'e': 'Elementary Charge',
+    'mu_0': 'Magnetic Constant',
+    'mu0': 'Magnetic Constant',
+    'alpha': 'Fine-Structure Constant',
+    'sigma': 'Stefan-Boltzmann Constant',
+    'R': 'Gas Constant',
+    'N_A': 'Avogadro\'s Number',
+    'F': 'Faraday Constant',
+    'atm': 'Standard Atmosphere',
+    'M_C12': 'Molar Mass of Carbon-12',
+}
+
+# Symbols that stand for an expression over other constants
+DERIVED = {
+    'hbar': 'h / (2 * pi)',
+}
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+class Plan:
+    # A compiled expression: a Python function over its inputs plus the
+    # names those inputs are resolved from. Compiling validates the syntax
+    # tree once; evaluating is a plain function call in any number mode.
+    __slots__ = ('expression', 'inputs', 'literals', 'function')
+
+    def __init__(self, expression, inputs, literals, function):
+        self.expression = expression
+        self.inputs = inputs
+        self.literals = literals
+        self.function = function
+
+    def __repr__(self):
+        return f'Plan({self.expression!r}, inputs={self.inputs!r})'
+
+    def evaluate(self, store=None, mode='float', precision=DEFAULT_PRECISION, values=None):
+        # `values` maps input names to numbers or NumPy arrays that replace
+        # (or add to) constants from the store, e.g. {'T': temperatures}
+        check_precision(precision)
+        store = store or default_store()
+        records = [None if values and key in values else _lookup(store, key) for key in self.inputs]
+        given = [values[key] if record is None else None for key, record in zip(self.inputs, records)]
+
+        if mode == 'float':
+            args = [float(record.value * record.unit.scale) if record is not None else value
+                    for record, value in zip(records, given)]
+            functions = _numpy_functions() if _has_array(args) else _FLOAT_FUNCTIONS
+            return self.function(functions, *args, *map(float, self.literals))
+
+        if mode == 'uncertainty':
+            args = [_uncertain(key, record) if record is not None else value
+                    for key, record, value in zip(self.inputs, records, given)]
+            functions = _uncertain_functions(_numpy_functions() if _has_array(args) else _FLOAT_FUNCTIONS)
+            result = self.function(functions, *args, *map(float, self.literals))
+            return result if isinstance(result, Uncertain) else Uncertain(result)
+
+        if mode == 'decimal':
+            with localcontext() as context:
+                context.prec = precision
+                args = [_decimal(record) if record is not None else Decimal(str(value))
+                        for record, value in zip(records, given)]
+                return +self.function(_DECIMAL_FUNCTIONS, *args, *map(Decimal, self.literals))
+
+        if mode == 'mpmath':
+            try:
+                import mpmath
+            except ImportError:
+                raise ExpressionError("mode 'mpmath' needs the mpmath package; use mode 'decimal'") from None
+            context = mpmath.mp.clone()
+            context.dps = precision
+            args = [context.mpf(str(_decimal(record))) if record is not None else context.mpf(str(value))
+                    for record, value in zip(records, given)]
+            return self.function(context, *args, *map(context.mpf, self.literals))
+
+        raise ExpressionError(f"Unknown mode '{mode}'; expected one of {', '.join(MODES)}")
+
+    def unit(self, store=None, units=None):
+        # SI dimensions of the result. Inputs that are not catalog constants
+        # need their unit text in `units`, e.g. {'T': 'K'}.
+        store = store or default_store()
+        args = []
+        for key in self.inputs:
+            if units and key in units:
+                args.append(_Dimension(parse_unit(units[key]).dims))
+            else:
+                args.append(_Dimension(_lookup(store, key).unit.dims))
+        result = self.function(_DIMENSION_FUNCTIONS, *args, *map(float, self.literals))
+        dims = result.dims if isinstance(result, _Dimension) else DIMENSIONLESS
+        unit = Unit(1.0, dims)
+        unit.symbol = unit.dimension_string()
+        return unit
+
+
+def check_precision(precision):
+    if not 1 <= precision <= MAX_PRECISION:
+        raise ExpressionError(f'Precision must be between 1 and {MAX_PRECISION} digits')
+    return precision
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression):
+    # Parse and validate once per expression text; later calls are a cache hit
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f'Expression is longer than {MAX_EXPRESSION_LENGTH} characters')
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression '{expression}': {e.msg}") from None
+    builder = _PlanBuilder(expression)
+    body = builder.visit(tree.body)
+    names = ['_f'] + [f'_i{i}' for i in range(len(builder.inputs))] + [f'_l{i}' for i in range(len(builder.literals))]
+    arguments = ast.arguments(posonlyargs=[], args=[ast.arg(name) for name in names],
+                              kwonlyargs=[], kw_defaults=[], defaults=[])
+    code = compile(ast.fix_missing_locations(ast.Expression(ast.Lambda(arguments, body))), '<expression>', 'eval')
+    function = eval(code, {'__builtins__': {}})
+    return Plan(expression, tuple(builder.inputs), tuple(builder.literals), function)
+
+
+def evaluate(expression, store=None, mode='float', precision=DEFAULT_PRECISION, values=None):
+    return compile_expression(expression).evaluate(store, mode, precision, values)
+
+
+class _PlanBuilder(ast.NodeTransformer):
+    # Rewrites constant names to positional inputs and function calls to the
+    # mode's namespace `_f`; anything else in the tree is rejected
+    OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow)
+
+    def __init__(self, expression, depth=0):
+        self.expression = expression
+        self.inputs = []
+        self.literals = []
+        self.depth = depth
+
+    def _input(self, key):
+        if key not in self.inputs:
+            self.inputs.append(key)
+        return ast.Name(f'_i{self.inputs.index(key)}', ast.Load())
+
+    def visit(self, node):
+        if isinstance(node, ast.BinOp) and isinstance(node.op, self.OPERATORS):
+            return ast.BinOp(self.visit(node.left), node.op, self.visit(node.right))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            return ast.UnaryOp(node.op, self.visit(node.operand))
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS:
+            if len(node.args) != 1 or node.keywords:
+                raise ExpressionError(f"{node.func.id}() takes exactly one argument")
+            return ast.Call(ast.Attribute(ast.Name('_f', ast.Load()), node.func.id, ast.Load()),
+                            [self.visit(node.args[0])], [])
+        if isinstance(node, ast.Name):
+            if node.id == 'pi':
+                return ast.Attribute(ast.Name('_f', ast.Load()), 'pi', ast.Load())
+            if node.id in DERIVED:
+                if self.depth > 8:
+                    raise ExpressionError(f"'{node.id}' is defined in terms of itself")
+                derived = ast.parse(DERIVED[node.id], mode='eval').body
+                inner = _PlanBuilder(DERIVED[node.id], self.depth + 1)
+                inner.inputs, inner.literals = self.inputs, self.literals
+                return inner.visit(derived)
+            return self._input(node.id)
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, str):
+                # Quoted catalog names, e.g. "Gas Constant" * 300
+                return self._input(node.value)
+            if isinstance(node.value, int) and not isinstance(node.value, bool):
+                # Integers too, so float modes compute 9**9**9 in floats
+                # (an OverflowError) rather than as an unbounded Python int
+                self.literals.append(repr(node.value))
+                return ast.Name(f'_l{len(self.literals) - 1}', ast.Load())
+            if isinstance(node.value, float):
+                # Float literals are passed in per mode, so Decimal mode keeps
+                # '0.1' exact instead of inheriting the binary float
+                self.literals.append(ast.get_source_segment(self.expression, node) or repr(node.value))
+                return ast.Name(f'_l{len(self.literals) - 1}', ast.Load())
+        raise ExpressionError(f"Unsupported syntax in '{self.expression}': {type(node).__name__}")
+
+
+def _lookup(store, key):
+    name = ALIASES.get(key, key)
+    record = store.get(name)
+    if record is None and '_' in name:
+        record = store.get(name.replace('_', ' '))
+    if record is None:
+        raise ExpressionError(f"Unknown constant '{key}'")
+    if not record.numeric or record.unit is None:
+        raise ExpressionError(f"'{record.name}' has no numeric value")
+    return record
+
+
+def _decimal(record):
+    scale = record.unit.scale
+    value = record.decimal
+    return value if scale == 1.0 else value * Decimal(repr(scale))
+
+
+def _has_array(args):
+    return any(hasattr(arg, 'shape') for arg in args)
+
+
+class _Namespace:
+    def __init__(self, **functions):
+        self.__dict__.update(functions)
+
+
+_FLOAT_FUNCTIONS = _Namespace(pi=math.pi, **{name: getattr(math, name) for name in FUNCTIONS})
+
+
+def _no_decimal(name):
+    def function(x):
+        raise ExpressionError(f"{name}() is not available in mode 'decimal'; use mode 'mpmath'")
+    return function
+
+
+_DECIMAL_FUNCTIONS = _Namespace(
+    pi=PI,
+    sqrt=lambda x: Decimal(x).sqrt(),
+    exp=lambda x: Decimal(x).exp(),
+    log=lambda x: Decimal(x).ln(),
+    log10=lambda x: Decimal(x).log10(),
+    sin=_no_decimal('sin'),
+    cos=_no_decimal('cos'),
+    tan=_no_decimal('tan'),
+)
+
+
+@lru_cache(maxsize=None)
+def _numpy_functions():
+    import numpy as np
+    return _Namespace(pi=np.pi, sqrt=np.sqrt, exp=np.exp, log=np.log, log10=np.log10,
+                      sin=np.sin, cos=np.cos, tan=np.tan)
+
+
+class Uncertain:
+    # A value with first-order uncertainty terms: `terms` maps each input
+    # name to (d result / d input) * input uncertainty. Inputs are treated as
+    # independent, so the combined uncertainty is the root sum of squares.
+    __slots__ = ('value', 'terms')
+
+    def __init__(self, value, terms=None):
+        self.value = value
+        self.terms = terms or {}
+
+    def __repr__(self):
+        return f'Uncertain({self.value!r} ± {self.uncertainty!r})'
+
+    @property
+    def uncertainty(self):
+        total = 0.0
+        for term in self.terms.values():
+            total = total + term * term
+        return total ** 0.5
+
+    @property
+    def relative_uncertainty(self):
+        return self.uncertainty / abs(self.value)
+
+    def budget(self):
+        # Each input's share of the variance
+        variance = self.uncertainty ** 2
+        return {name: term * term / variance for name, term in self.terms.items()} if variance else {}
+
+    def _combine(self, value, da, other, db):
+        # d(result) = da * d(self) + db * d(other)
+        terms = {name: da * term for name, term in self.terms.items()}
+        if isinstance(other, Uncertain):
+            for name, term in other.terms.items():
+                terms[name] = terms.get(name, 0.0) + db * term
+        return Uncertain(value, terms)
+
+    def __add__(self, other):
+        b = other.value if isinstance(other, Uncertain) else other
+        return self._combine(self.value + b, 1.0, other, 1.0)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        b = other.value if isinstance(other, Uncertain) else other
+        return self._combine(self.value - b, 1.0, other, -1.0)
+
+    def __rsub__(self, other):
+        return self._combine(other - self.value, -1.0, None, 0.0)
+
+    def __mul__(self, other):
+        b = other.value if isinstance(other, Uncertain) else other
+        return self._combine(self.value * b, b, other, self.value)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        b = other.value if isinstance(other, Uncertain) else other
+        return self._combine(self.value / b, 1.0 / b, other, -self.value / (b * b))
+
+    def __rtruediv__(self, other):
+        value = other / self.value
+        return self._combine(value, -value / self.value, None, 0.0)
+
+    def __pow__(self, other):
+        b = other.value if isinstance(other, Uncertain) else other
+        value = self.value ** b
+        da = b * self.value ** (b - 1)
+        db = value * _log(self.value) if isinstance(other, Uncertain) else 0.0
+        return self._combine(value, da, other, db)
+
+    def __rpow__(self, other):
+        value = other ** self.value
+        return self._combine(value, value * _log(other), None, 0.0)
+
+    def __neg__(self):
+        return self._combine(-self.value, -1.0, None, 0.0)
+
+    def __pos__(self):
+        return self
+
+
+def _log(x):
+    return x.log() if hasattr(x, 'log') else math.log(x) if not hasattr(x, 'shape') else _numpy_functions().log(x)
+
+
+def _uncertain(key, record):
+    scale = record.unit.scale
+    value = float(record.value * scale)
+    return Uncertain(value, {key: record.uncertainty * scale} if record.uncertainty else None)
+
+
+def _uncertain_functions(base):
+    # Lift each function with its derivative so terms propagate linearly
+    def lift(function, derivative):
+        def lifted(x):
+            if not isinstance(x, Uncertain):
+                return function(x)
+            return x._combine(function(x.value), derivative(x.value), None, 0.0)
+        return lifted
+
+    return _Namespace(
+        pi=base.pi,
+        sqrt=lift(base.sqrt, lambda x: 0.5 / base.sqrt(x)),
+        exp=lift(base.exp, base.exp),
+        log=lift(base.log, lambda x: 1.0 / x),
+        log10=lift(base.log10, lambda x: 1.0 / (x * math.log(10))),
+        sin=lift(base.sin, base.cos),
+        cos=lift(base.cos, lambda x: -base.sin(x)),
+        tan=lift(base.tan, lambda x: 1.0 / base.cos(x) ** 2),
+    )
+
+
+class _Dimension:
+    # Dimension vector arithmetic for Plan.unit()
+    __slots__ = ('dims',)
+
+    def __init__(self, dims=DIMENSIONLESS):
+        self.dims = dims
+
+    def _same(self, other, operation):
+        dims = other.dims if isinstance(other, _Dimension) else DIMENSIONLESS
+        if dims != self.dims:
+            raise ExpressionError(
+                f"Cannot {operation} '{Unit(1.0, self.dims).dimension_string() or 'dimensionless'}' "
+                f"and '{Unit(1.0, dims).dimension_string() or 'dimensionless'}'"
+            )
+        return self
+
+    def __add__(self, other):
+        return self._same(other, 'add')
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._same(other, 'subtract')
+
+    __rsub__ = __sub__
+
+    def __mul__(self, other):
+        if not isinstance(other, _Dimension):
+            return self
+        return _Dimension(tuple(a + b for a, b in zip(self.dims, other.dims)))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if not isinstance(other, _Dimension):
+            return self
+        return _Dimension(tuple(a - b for a, b in zip(self.dims, other.dims)))
+
+    def __rtruediv__(self, other):
+        return _Dimension(tuple(-a for a in self.dims))
+
+    def __pow__(self, other):
+        if isinstance(other, _Dimension):
+            if other.dims != DIMENSIONLESS:
+                raise ExpressionError('Exponents must be dimensionless')
+            if self.dims != DIMENSIONLESS:
+                raise ExpressionError('Cannot raise a dimensioned value to a constant power')
+            return self
+        dims = tuple(a * other for a in self.dims)
+        if any(d != int(d) for d in dims):
+            raise ExpressionError(f'Power {other} leaves fractional dimensions')
+        return _Dimension(tuple(int(d) for d in dims))
+
+    def __rpow__(self, other):
+        return self._same(None, 'exponentiate')
+
+    def __neg__(self):
+        return self
+
+    def __pos__(self):
+        return self
+
+
+def _dimensionless_function(name):
+    def function(x):
+        if isinstance(x, _Dimension) and x.dims != DIMENSIONLESS:
+            raise ExpressionError(f'{name}() needs a dimensionless argument')
+        return _Dimension()
+    return function
+
+
+def _sqrt_dimension(x):
+    return x ** 0.5 if isinstance(x, _Dimension) else _Dimension()
+
+
+_DIMENSION_FUNCTIONS = _Namespace(
+    pi=1.0,
+    sqrt=_sqrt_dimension,
+    **{name: _dimensionless_function(name) for name in FUNCTIONS if name != 'sqrt'},
+)
@@ -0,0 +1,34 @@
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode='wb', encoding=None, newline=None, fsync=False):
+    # Write to a temporary file next to `path` that replaces it only when the
+    # block completes, so readers never see a partial file. The pid keeps
+    # concurrent writers apart; on any failure the temporary file is removed.
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, mode, encoding=encoding, newline=newline) as file:
+            yield file
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def prune(directory, prefix, suffix, keep):
+    # Remove the files in `directory` named prefix...suffix other than `keep`,
+    # e.g. caches built from older sources. Files that cannot be removed are skipped.
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix) and name != keep:
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
@@ -0,0 +1,199 @@
+from collections import deque
+from itertools import islice
+
+from expr import ALIASES, ExpressionError, compile_expression
+from units import DIMENSIONLESS
+
+# Defining relations between catalog constants, as expressions over the
+# short symbols in expr.ALIASES
+FORMULAS = {
+    'Gas Constant': 'N_A * k_B',
+    'Faraday Constant': 'N_A * e',
+    'Stefan-Boltzmann Constant': '2 * pi**5 * k_B**4 / (15 * h**3 * c**2)',
+    'Fine-Structure Constant': 'mu_0 * c * e**2 / (2 * h)',
+}
+# A formula agrees with its constant when they differ by at most this many
+# combined standard uncertainties (including rounding of the printed value)
+CHECK_SIGMA = 3
+# Relative tolerance when both sides are exact
+EXACT_TOLERANCE = 1e-12
+RELATED_LIMIT = 8
+
+
+class Check:
+    # Outcome of comparing one constant with its defining formula, in SI units
+    __slots__ = ('name', 'formula', 'expected', 'computed', 'tolerance', 'error')
+
+    def __init__(self, name, formula, expected=None, computed=None, tolerance=None, error=None):
+        self.name = name
+        self.formula = formula
+        self.expected = expected
+        self.computed = computed
+        self.tolerance = tolerance
+        self.error = error
+
+    @property
+    def deviation(self):
+        # |computed - expected| in units of the tolerance; <= 1 is consistent
+        if self.error is not None:
+            return None
+        difference = abs(self.computed - self.expected)
+        return difference / self.tolerance if self.tolerance else (0.0 if not difference else float('inf'))
+
+    @property
+    def consistent(self):
+        return self.error is None and self.deviation <= 1
+
+
+class ConstantGraph:
+    # Relationships between the constants of a store (or release view).
+    # Nodes are records, so a constant listed under several categories is
+    # one node. Edges come from FORMULAS (a constant and the constants its
+    # formula uses) and from shared SI dimensions; both are indexed by id in
+    # one pass, so neighbour queries never scan the catalog. update() keeps
+    # the indexes in step with changes to the store.
+    def __init__(self, store, formulas=FORMULAS):
+        self.store = store
+        self.nodes = {}
+        self.formulas = {}
+        self._formula_texts = formulas
+        self._inputs = {}
+        self._derived = {}
+        # {dims: {id: None}}, insertion-ordered sets of ids
+        self._by_dims = {}
+        for record in store:
+            self.nodes[record.id] = record
+            self._add_dims(record)
+        self._link_formulas()
+
+    def _add_dims(self, record):
+        dims = record.dims
+        if dims is not None and dims != DIMENSIONLESS:
+            self._by_dims.setdefault(dims, {})[record.id] = None
+
+    def _remove_dims(self, record):
+        members = self._by_dims.get(record.dims)
+        if members is not None:
+            members.pop(record.id, None)
+            if not members:
+                del self._by_dims[record.dims]
+
+    def _id(self, name):
+        record = self.store.get(name)
+        return record.id if record is not None and record.id in self.nodes else None
+
+    def _link_formulas(self):
+        self.formulas.clear()
+        self._inputs.clear()
+        self._derived.clear()
+        for name, formula in self._formula_texts.items():
+            target = self._id(name)
+            if target is None:
+                continue
+            try:
+                keys = compile_expression(formula).inputs
+            except ExpressionError:
+                continue
+            inputs = tuple(self._id(ALIASES.get(key, key)) for key in keys)
+            if None in inputs:
+                continue
+            self.formulas[target] = formula
+            self._inputs[target] = inputs
+            for source in inputs:
+                self._derived.setdefault(source, []).append(target)
+
+    def update(self, records=(), removed=()):
+        # Take in records added or rewritten in the store and drop retired
+        # ids. Costs the size of the change plus relinking the few formulas.
+        for i in removed:
+            record = self.nodes.pop(i, None)
+            if record is not None:
+                self._remove_dims(record)
+        for record in records:
+            old = self.nodes.get(record.id)
+            if old is record:
+                continue
+            if old is not None:
+                self._remove_dims(old)
+            if not record.categories:
+                self.nodes.pop(record.id, None)
+                continue
+            self.nodes[record.id] = record
+            self._add_dims(record)
+        self._link_formulas()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _records(self, ids):
+        return [self.nodes[i] for i in ids]
+
+    def inputs(self, record):
+        # Constants `record` is defined in terms of
+        return self._records(self._inputs.get(record.id, ()))
+
+    def derived(self, record):
+        # Constants whose formula uses `record` directly
+        return self._records(self._derived.get(record.id, ()))
+
+    def derived_from(self, record):
+        # Everything that depends on `record`, directly or through other
+        # formulas, nearest first; each edge is followed once
+        seen = {record.id}
+        order = []
+        queue = deque(self._derived.get(record.id, ()))
+        while queue:
+            i = queue.popleft()
+            if i in seen:
+                continue
+            seen.add(i)
+            order.append(i)
+            queue.extend(self._derived.get(i, ()))
+        return self._records(order)
+
+    def same_dimensions(self, record, limit=None):
+        # Other constants with the dimensions of `record`, at most `limit`
+        dims = record.dims
+        if dims is None or dims == DIMENSIONLESS:
+            return []
+        ids = (i for i in self._by_dims.get(dims, ()) if i != record.id)
+        return self._records(islice(ids, limit))
+
+    def related(self, record, limit=RELATED_LIMIT):
+        # [(record, note)] for the details panel: formula neighbours first,
+        # then up to `limit` constants with the same dimensions
+        related = []
+        formula = self.formulas.get(record.id)
+        if formula is not None:
+            related.extend((other, f'in {record.name} = {formula}') for other in self.inputs(record))
+        related.extend((other, f'{other.name} = {self.formulas[other.id]}') for other in self.derived(record))
+        seen = {other.id for other, _ in related}
+        dimension = record.unit.dimension_string() if record.unit is not None else ''
+        for other in self.same_dimensions(record, limit):
+            if other.id not in seen:
+                related.append((other, f'also {dimension}'))
+        return related
+
+    def check(self, sigma=CHECK_SIGMA):
+        # Compare every constant that has a formula with the value the formula
+        # gives from the other constants, propagating their uncertainties
+        checks = []
+        for i, formula in self.formulas.items():
+            record = self.nodes[i]
+            try:
+                result = compile_expression(formula).evaluate(self.store, 'uncertainty')
+            except (ExpressionError, ArithmeticError) as e:
+                checks.append(Check(record.name, formula, error=str(e)))
+                continue
+            scale = record.unit.scale
+            variance = result.uncertainty ** 2 + (record.uncertainty * scale) ** 2 + (_rounding(record) * scale) ** 2
+            expected = record.value * scale
+            tolerance = sigma * variance ** 0.5 or EXACT_TOLERANCE * abs(expected)
+            checks.append(Check(record.name, formula, expected, result.value, tolerance))
+        return checks
+
+
+def _rounding(record):
+    # Half a unit in the last printed digit of the value
+    digits = record.mantissa.as_tuple()
+    return 0.5 * 10.0 ** (digits.exponent + record.exponent) if record.uncertainty == 0 else 0.0
@@ -0,0 +1,170 @@
+import json
+import os
+import time
+
+from files import atomic_write
+
+DEFAULT_CAPACITY = 10000
+# Compact once the file holds this many times more events than are kept
+COMPACT_RATIO = 2
+
+
+def data_dir():
+    override = os.environ.get('SCIENTIFIC_CONSTANTS_DATA')
+    if override:
+        return override
+    base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'scientific-constants')
+
+
+class HistoryEvent:
+    __slots__ = ('timestamp', 'name', 'value', 'kind')
+
+    def __init__(self, timestamp, name, value, kind='copy'):
+        self.timestamp = timestamp
+        self.name = name
+        self.value = value
+        self.kind = kind
+
+    def to_json(self):
+        return json.dumps({'t': self.timestamp, 'name': self.name, 'value': self.value, 'kind': self.kind},
+                          ensure_ascii=False)
+
+
+class HistoryLog:
+    # Copy/lookup history kept in a fixed-size ring buffer and mirrored to an
+    # append-only JSON Lines file. When the file grows past COMPACT_RATIO times
+    # the capacity it is rewritten with only the retained events, preceded by
+    # a stats line so per-constant counts and last-use times survive.
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self._events = [None] * capacity
+        self._start = 0
+        self._count = 0
+        self._lines = 0
+        self._stats = {}
+        self._listeners = []
+        self._load()
+        # Events recorded since the log was opened; views use it to find new rows
+        self.recorded = 0
+
+    @classmethod
+    def open_default(cls, capacity=DEFAULT_CAPACITY):
+        return cls(os.path.join(data_dir(), 'history.jsonl'), capacity)
+
+    def _load(self):
+        try:
+            file = open(self.path, encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with file:
+            for line in file:
+                self._lines += 1
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash; the rest of the log is still good
+                    continue
+                if 'stats' in item:
+                    for name, (count, last) in item['stats'].items():
+                        self._stats[name] = [count, last]
+                else:
+                    self._push(HistoryEvent(item['t'], item['name'], item.get('value', ''), item.get('kind', 'copy')))
+
+    def _push(self, event):
+        stats = self._stats.get(event.name)
+        if stats is None:
+            self._stats[event.name] = [1, event.timestamp]
+        else:
+            stats[0] += 1
+            stats[1] = max(stats[1], event.timestamp)
+        end = (self._start + self._count) % self.capacity
+        self._events[end] = event
+        if self._count < self.capacity:
+            self._count += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def add_listener(self, callback):
+        # callback(event) runs after every recorded event
+        self._listeners.append(callback)
+
+    def record(self, name, value, kind='copy', timestamp=None):
+        event = HistoryEvent(time.time() if timestamp is None else timestamp, name, value, kind)
+        self._push(event)
+        self.recorded += 1
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(event.to_json())
+            file.write('\n')
+        self._lines += 1
+        if self._lines > self.capacity * COMPACT_RATIO:
+            self.compact()
+        for callback in self._listeners:
+            callback(event)
+        return event
+
+    def compact(self):
+        # Rewrite the log as a stats line plus the retained events. Retained
+        # events are counted again on reload, so the stats line only carries
+        # the counts of events that were dropped from the ring.
+        retained = {}
+        for event in self.events():
+            retained[event.name] = retained.get(event.name, 0) + 1
+        dropped = {}
+        for name, (count, last) in self._stats.items():
+            if count > retained.get(name, 0):
+                dropped[name] = [count - retained.get(name, 0), last]
+
+        with atomic_write(self.path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({'stats': dropped}, ensure_ascii=False))
+            file.write('\n')
+            for event in self.events():
+                file.write(event.to_json())
+                file.write('\n')
+        self._lines = self._count + 1
+
+    def clear(self):
+        self._events = [None] * self.capacity
+        self._start = self._count = self._lines = 0
+        self._stats = {}
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        # Oldest first; O(1) for any index
+        if not -self._count <= index < self._count:
+            raise IndexError(index)
+        return self._events[(self._start + index % self._count) % self.capacity]
+
+    def events(self):
+        for i in range(self._count):
+            yield self._events[(self._start + i) % self.capacity]
+
+    def newest(self, index):
+        return self[self._count - 1 - index]
+
+    def page(self, offset, count):
+        # `count` events starting `offset` back from the newest
+        end = min(self._count, offset + count)
+        return [self.newest(i) for i in range(offset, end)]
+
+    def frequency(self, name):
+        stats = self._stats.get(name)
+        return stats[0] if stats else 0
+
+    def last_used(self, name):
+        stats = self._stats.get(name)
+        return stats[1] if stats else None
+
+    def most_frequent(self, limit=10):
+        ranked = sorted(self._stats.items(), key=lambda item: (-item[1][0], -item[1][1]))
+        return [(name, stats[0]) for name, stats in ranked[:limit]]
+
+    def most_recent(self, limit=10):
+        ranked = sorted(self._stats.items(), key=lambda item: -item[1][1])
+        return [(name, stats[1]) for name, stats in ranked[:limit]]
@@ -0,0 +1,212 @@
+import mmap
+import os
+import struct
+
+from files import atomic_write, prune
+
+SOURCE_LANGUAGE = 'en'
+LANGUAGES = {
+    'en': 'English',
+    'es': 'Español',
+    'fr': 'Français',
+    'de': 'Deutsch',
+}
+DOMAIN = 'constants'
+LOCALE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locale')
+
+# GNU gettext .mo layout: magic, revision, message count, offsets of the
+# original and translated string tables, hash table size and offset
+MO_MAGIC = 0x950412de
+MO_HEADER = struct.Struct('<7I')
+
+
+class TranslationError(ValueError):
+    pass
+
+
+def parse_po(path):
+    # {msgid: msgstr} from a .po file, including the '' metadata entry;
+    # untranslated and fuzzy entries are skipped
+    import ast
+
+    messages = {}
+    entry = {}
+    field = None
+
+    with open(path, encoding='utf-8') as file:
+        for number, line in enumerate(list(file) + [''], 1):
+            line = line.strip()
+            # An entry ends at a blank line or where the next one's comments or msgid start
+            if entry.get('msgstr') is not None and (not line or line.startswith(('#', 'msgid '))):
+                if entry.get('msgid') is not None and entry['msgstr'] and not entry.get('fuzzy'):
+                    messages[entry['msgid']] = entry['msgstr']
+                entry, field = {}, None
+            try:
+                if line.startswith('#,'):
+                    entry['fuzzy'] = 'fuzzy' in line
+                elif line.startswith(('msgid ', 'msgstr ')):
+                    field, _, text = line.partition(' ')
+                    entry[field] = ast.literal_eval(text)
+                elif line.startswith('"') and field is not None:
+                    entry[field] += ast.literal_eval(line)
+            except (ValueError, SyntaxError, TypeError):
+                raise TranslationError(f"{path}:{number}: malformed line") from None
+    return messages
+
+
+def build_mo(messages):
+    # Serialize {msgid: msgstr} as a .mo file with originals sorted by their
+    # UTF-8 bytes, the order Translations binary searches in
+    entries = sorted((msgid.encode('utf-8'), msgstr.encode('utf-8')) for msgid, msgstr in messages.items())
+    count = len(entries)
+    originals = MO_HEADER.size
+    translations = originals + 8 * count
+    position = translations + 8 * count
+    tables = []
+    for table in (0, 1):
+        offsets = []
+        for entry in entries:
+            offsets.append(struct.pack('<II', len(entry[table]), position))
+            position += len(entry[table]) + 1
+        tables.append(b''.join(offsets))
+    strings = b''.join(entry[table] + b'\0' for table in (0, 1) for entry in entries)
+    return MO_HEADER.pack(MO_MAGIC, 0, count, originals, translations, 0, 0) + tables[0] + tables[1] + strings
+
+
+def write_mo(path, messages):
+    with atomic_write(path) as file:
+        file.write(build_mo(messages))
+
+
+class Translations:
+    # A compiled (.mo) catalog, memory-mapped on first lookup (or read from
+    # `buffer`). gettext() binary searches the sorted original strings in
+    # place, so only the messages actually asked for are ever decoded.
+    def __init__(self, path, buffer=None):
+        self.path = path
+        self._map = None
+        self._buffer = buffer
+        self._entry = None
+        self._count = 0
+        self._cache = {}
+
+    def _open(self):
+        if self._buffer is None:
+            with open(self.path, 'rb') as file:
+                try:
+                    self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    raise TranslationError(f"'{self.path}' is empty") from None
+            self._buffer = memoryview(self._map)
+        buffer = self._buffer
+        if len(buffer) < MO_HEADER.size:
+            raise TranslationError(f"'{self.path}' is not a .mo file")
+        for order in ('<', '>'):
+            header = struct.unpack_from(f'{order}7I', buffer, 0)
+            if header[0] == MO_MAGIC:
+                break
+        else:
+            raise TranslationError(f"'{self.path}' is not a .mo file")
+        self._entry = struct.Struct(f'{order}II')
+        self._count, self._originals, self._translations = header[2:5]
+
+    def _string(self, table, i):
+        length, offset = self._entry.unpack_from(self._buffer, table + 8 * i)
+        return bytes(self._buffer[offset:offset + length])
+
+    def __len__(self):
+        if self._entry is None:
+            self._open()
+        return self._count
+
+    def gettext(self, message):
+        translated = self._cache.get(message)
+        if translated is not None:
+            return translated
+        if self._entry is None:
+            self._open()
+        key = message.encode('utf-8')
+        low, high = 0, self._count
+        translated = message
+        while low < high:
+            middle = (low + high) // 2
+            original = self._string(self._originals, middle)
+            if original == key:
+                translated = str(self._string(self._translations, middle), 'utf-8')
+                break
+            if original < key:
+                low = middle + 1
+            else:
+                high = middle
+        self._cache[message] = translated
+        return translated
+
+    def __iter__(self):
+        # (msgid, msgstr) pairs, skipping the metadata entry
+        for i in range(len(self)):
+            original = self._string(self._originals, i)
+            if original:
+                yield str(original, 'utf-8'), str(self._string(self._translations, i), 'utf-8')
+
+    def close(self):
+        if self._map is not None:
+            self._buffer.release()
+            self._map.close()
+        self._map = self._buffer = self._entry = None
+        self._count = 0
+
+
+def po_path(language):
+    return os.path.join(LOCALE_DIR, language, 'LC_MESSAGES', f'{DOMAIN}.po')
+
+
+_loaded = {}
+
+
+def translations(language):
+    # Translations for `language`, compiled from its .po file into the cache
+    # directory the first time (and whenever the .po file changes); None for
+    # the source language
+    if language == SOURCE_LANGUAGE:
+        return None
+    loaded = _loaded.get(language)
+    if loaded is not None:
+        return loaded
+    source = po_path(language)
+    try:
+        stat = os.stat(source)
+    except OSError:
+        raise TranslationError(f"No translations for '{language}'") from None
+
+    from snapshot import cache_dir
+
+    directory = os.path.join(cache_dir(), 'locale')
+    prefix = f'{DOMAIN}-{language}-'
+    name = f'{prefix}{stat.st_size:x}-{stat.st_mtime_ns:x}.mo'
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        messages = parse_po(source)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            write_mo(path, messages)
+            prune(directory, prefix, '.mo', name)
+        except OSError:
+            # Without a writable cache the compiled catalog lives in memory
+            loaded = _loaded[language] = Translations(path, memoryview(build_mo(messages)))
+            return loaded
+    loaded = _loaded[language] = Translations(path)
+    return loaded
+
+
+def localized_texts(store, catalog):
+    # {record id: (name, description)} in the catalog's language, for
+    # SearchIndex.localize. Only the catalog's entries are visited, so the
+    # cost follows the number of translations rather than the store size.
+    texts = {}
+    if catalog is None:
+        return texts
+    for msgid, msgstr in catalog:
+        record = store.get(msgid)
+        if record is not None and record.name == msgid:
+            texts[record.id] = (msgstr, catalog.gettext(record.description) if record.description else '')
+    return texts
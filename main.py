@@ -1,166 +1,99 @@
+import os
 import sys
-import json
+import time
+
+_started = time.perf_counter()
+
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QPushButton, QVBoxLayout,
-    QHBoxLayout, QMessageBox, QTableWidget, QTableWidgetItem, QComboBox,
-    QStackedWidget, QTextEdit, QGroupBox, QGridLayout, QCheckBox, QColorDialog, 
-    QFileDialog, QDialog, QFormLayout, QSpinBox, QSlider, QMenuBar, QAction
+    QHBoxLayout, QMessageBox, QTableView, QHeaderView, QAbstractItemView, QComboBox,
+    QTextEdit, QGridLayout, QColorDialog, QFileDialog, QDialog, QFormLayout,
+    QMenuBar, QAction, QProgressDialog, QInputDialog
 )
-from PyQt5.QtGui import QIcon, QColor, QPalette
-from PyQt5.QtCore import Qt
-from constants import CONSTANTS
-
-# Dictionary of scientific constants
-CONSTANTS = {
-    'Physics': {
-        'Speed of Light': {
-            'value': '299,792,458 m/s',
-            'description': 'The speed of light in vacuum.'
-        },
-        'Gravitational Constant': {
-            'value': '6.67430 × 10^-11 m^3 kg^-1 s^-2',
-            'description': 'The constant of proportionality in Newton\'s law of gravitation.'
-        },
-        'Planck\'s Constant': {
-            'value': '6.62607015 × 10^-34 J s',
-            'description': 'The fundamental constant relating energy and frequency of photons.'
-        },
-        'Boltzmann Constant': {
-            'value': '1.380649 × 10^-23 J/K',
-            'description': 'The physical constant relating the average kinetic energy of particles in a gas with the temperature of the gas.'
-        },
-        'Elementary Charge': {
-            'value': '1.602176634 × 10^-19 C',
-            'description': 'The magnitude of electric charge carried by a single proton.'
-        },
-        'Magnetic Constant': {
-            'value': '4π × 10^-7 N/A^2',
-            'description': 'The proportionality constant in the magnetic component of Maxwell\'s equations.'
-        },
-        'Fine-Structure Constant': {
-            'value': '0.0072973525693',
-            'description': 'A dimensionless constant characterizing the strength of the electromagnetic interaction.'
-        },
-        'Cosmological Constant': {
-            'value': '8πGρ/3 - Λ',
-            'description': 'The constant in Einstein\'s field equations of General Relativity, associated with dark energy.'
-        },
-        'Stefan-Boltzmann Constant': {
-            'value': '5.670374419 × 10^-8 W m^-2 K^-4',
-            'description': 'The constant in Stefan-Boltzmann law relating temperature to thermal radiation emitted by a black body.'
-        },
-        'Gas Constant': {
-            'value': '8.314462618 J mol^-1 K^-1',
-            'description': 'The constant in the ideal gas law.'
-        },
-        'Avogadro\'s Number': {
-            'value': '6.02214076 × 10^23 mol^-1',
-            'description': 'The number of atoms or molecules in one mole of a substance.'
-        },
-        'Faraday Constant': {
-            'value': '96485.33212 C/mol',
-            'description': 'The magnitude of electric charge per mole of electrons.'
-        },
-        'Standard Atmosphere': {
-            'value': '101,325 Pa',
-            'description': 'The standard pressure at sea level.'
-        },
-        'Molar Mass of Carbon-12': {
-            'value': '12.00000 g/mol',
-            'description': 'The molar mass of the carbon-12 isotope, used as the standard for atomic mass units.'
-        },
-    },
-    'Chemistry': {
-        'Gas Constant': {
-            'value': '8.314462618 J mol^-1 K^-1',
-            'description': 'The constant in the ideal gas law.'
-        },
-        'Avogadro\'s Number': {
-            'value': '6.02214076 × 10^23 mol^-1',
-            'description': 'The number of atoms or molecules in one mole of a substance.'
-        },
-        'Faraday Constant': {
-            'value': '96485.33212 C/mol',
-            'description': 'The magnitude of electric charge per mole of electrons.'
-        },
-        'Standard Atmosphere': {
-            'value': '101,325 Pa',
-            'description': 'The standard pressure at sea level.'
-        },
-        'Molar Mass of Carbon-12': {
-            'value': '12.00000 g/mol',
-            'description': 'The molar mass of the carbon-12 isotope, used as the standard for atomic mass units.'
-        },
-        'Ionization Energy of Hydrogen': {
-            'value': '13.598 eV',
-            'description': 'The energy required to ionize a hydrogen atom.'
-        },
-        'Bond Dissociation Energy of H2': {
-            'value': '435.88 kJ/mol',
-            'description': 'The energy required to dissociate a hydrogen molecule into two hydrogen atoms.'
-        },
-        'Standard Molar Entropy of Water': {
-            'value': '69.91 J mol^-1 K^-1',
-            'description': 'The entropy of water in its standard state at 298 K.'
-        },
-        'Standard Enthalpy of Formation of Water': {
-            'value': '-285.83 kJ/mol',
-            'description': 'The enthalpy change when one mole of water is formed from its elements in their standard states.'
-        },
-        'Thermal Conductivity of Copper': {
-            'value': '401 W m^-1 K^-1',
-            'description': 'The ability of copper to conduct heat.'
-        },
-    },
-    'Mathematics': {
-        'Euler\'s Number (e)': {
-            'value': '2.718281828',
-            'description': 'The base of the natural logarithm, used extensively in mathematics.'
-        },
-        'Pi (π)': {
-            'value': '3.14159265359',
-            'description': 'The ratio of the circumference of a circle to its diameter.'
-        },
-        'Golden Ratio (φ)': {
-            'value': '1.61803398875',
-            'description': 'The number that appears in various contexts in mathematics, art, and nature.'
-        },
-        'Square Root of 2 (√2)': {
-            'value': '1.41421356237',
-            'description': 'The length of the diagonal of a square with side length 1.'
-        },
-        'Square Root of 3 (√3)': {
-            'value': '1.73205080757',
-            'description': 'The length of the diagonal of a cube with side length 1.'
-        },
-        'Natural Logarithm of 2 (ln 2)': {
-            'value': '0.69314718056',
-            'description': 'The natural logarithm of 2.'
-        },
-        'Logarithm Base 10 of 2 (log10 2)': {
-            'value': '0.30102999566',
-            'description': 'The logarithm of 2 with base 10.'
-        },
-        'Catalan\'s Constant': {
-            'value': '0.91596559416',
-            'description': 'A constant that appears in combinatorial mathematics.'
-        },
-        'Ramanujan\'s Constant': {
-            'value': '1.2824271291',
-            'description': 'A constant related to the distribution of prime numbers.'
-        },
-        'Feigenbaum Constants': {
-            'value': 'δ ≈ 4.66920160910, α ≈ 2.50290787595',
-            'description': 'Constants that arise in the study of bifurcations in chaotic systems.'
-        },
-    }
-}
+from PyQt5.QtGui import QIcon, QKeySequence, QPalette
+from PyQt5.QtCore import Qt, QSocketNotifier, QTimer
 
+_qt_imported = time.perf_counter()
 
-class ConstantsViewer(QWidget):
+import perf
+import snapshot
+from catalog import EXTENSION as CATALOG_EXTENSION
+from i18n import SOURCE_LANGUAGE
+from models import ConstantsFilterModel, ConstantsTableModel
+from tasks import TaskScheduler
+from units import UnitError, compatible_units, compile_conversion
+
+_app_imported = time.perf_counter()
+
+ALL_CATEGORIES = 'All Categories'
+CONSTANT_FILE_FILTER = (
+    "JSON Files (*.json);;JSON Lines (*.jsonl);;CSV Files (*.csv);;"
+    f"Constant Catalogs (*{CATALOG_EXTENSION})"
+)
+SEARCH_DEBOUNCE_MS = 150
+# A query with no exact hits falls back to fuzzy matching once typing has
+# paused this long, instead of on every keystroke
+FUZZY_DELAY_MS = 400
+# Holding an arrow key renders the details of the row it stops on, not every row passed
+DETAILS_DELAY_MS = 30
+# A constant counts as looked up once its details have been on screen this
+# long, so scrolling past rows with the arrow keys does not log each of them
+LOOKUP_DWELL_MS = 1500
+# Catalogs at least this large are searched on the worker pool
+ASYNC_SEARCH_THRESHOLD = 20000
+# Slots timed when instrumentation is on (--perf)
+INSTRUMENTED_SLOTS = (
+    'update_table', 'show_constant_details', 'copy_constant', 'import_constants', 'export_constants',
+    'apply_catalog_diff', 'set_language', 'unit_conversion', 'view_history', 'show_history_graph',
+)
+GRAPH_KINDS = (("All uses", None), ("Copies", 'copy'), ("Lookups", 'lookup'))
+GRAPH_RANGES = (
+    ("Last hour", 3600), ("Last day", 86400), ("Last week", 7 * 86400),
+    ("Last 30 days", 30 * 86400), ("Last year", 365 * 86400), ("All time", 0),
+)
+
+
+class StartupProfile:
+    # Wall-clock time per startup phase, reported by --profile-startup
     def __init__(self):
+        self.phases = [
+            ('import PyQt5', _qt_imported - _started),
+            ('import application modules', _app_imported - _qt_imported),
+        ]
+        self.last = _app_imported
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        width = max(len(phase) for phase, _ in self.phases)
+        for phase, seconds in self.phases:
+            stream.write(f"{phase:<{width}}  {seconds * 1000:8.1f} ms\n")
+        stream.write(f"{'total':<{width}}  {(self.last - _started) * 1000:8.1f} ms\n")
+        stream.flush()
+
+
+class ConstantsViewer(QWidget):
+    def __init__(self, profile=None):
         super().__init__()
+        self.profile = profile
+        # Parsed store and search index, from the cached snapshot when it is current
+        self.store, self.search_index = snapshot.load()
+        self.mark_startup('load catalog snapshot')
+        self.tasks = TaskScheduler(self)
+        # Wrapped before initUI connects them, so signals reach the timed versions
+        perf.instrument(self, INSTRUMENTED_SLOTS, 'viewer')
         self.initUI()
+        if perf.recorder is not None:
+            self.start_perf_overlay(perf.recorder)
+        self.mark_startup('build window')
+
+    def mark_startup(self, phase):
+        if self.profile is not None:
+            self.profile.mark(phase)
 
     def initUI(self):
         self.setWindowTitle('Advanced Scientific Constants Viewer')
@@ -182,26 +115,58 @@ class ConstantsViewer(QWidget):
         main_layout = QVBoxLayout()
 
         # Dropdown to select category
+        # Items carry the category name as data, so their text can be translated
         self.category_box = QComboBox(self)
-        self.category_box.addItems(CONSTANTS.keys())
+        for category in self.store.categories():
+            self.category_box.addItem(category, category)
+        self.category_box.addItem(ALL_CATEGORIES, None)
         self.category_box.currentIndexChanged.connect(self.update_table)
 
-        # Search bar
+        # Search bar, debounced so a burst of keystrokes runs a single query
         self.search_bar = QLineEdit(self)
         self.search_bar.setPlaceholderText("Search for a constant...")
-        self.search_bar.textChanged.connect(self.update_table)
-
-        # Table for displaying constants
-        self.table = QTableWidget(0, 2)
-        self.table.setHorizontalHeaderLabels(['Constant', 'Value'])
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.update_table)
+        self.search_bar.textChanged.connect(self.search_timer.start)
+        self.fuzzy_timer = QTimer(self)
+        self.fuzzy_timer.setSingleShot(True)
+        self.fuzzy_timer.setInterval(FUZZY_DELAY_MS)
+        self.fuzzy_timer.timeout.connect(self.show_fuzzy_matches)
+        self.search_bar.textChanged.connect(self.fuzzy_timer.stop)
+
+        # Table for displaying constants. The view only asks the model for
+        # visible cells, and the filter model updates rows in place.
+        self.table_model = ConstantsTableModel(self.store, self)
+        self.filter_model = ConstantsFilterModel(self)
+        self.filter_model.setSourceModel(self.table_model)
+        self.table = QTableView(self)
+        self.table.setModel(self.filter_model)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setWordWrap(False)
         self.table.verticalHeader().setVisible(False)
-        self.table.itemSelectionChanged.connect(self.show_constant_details)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.horizontalHeader().setStretchLastSection(True)
 
-        # Text edit for displaying constant details
+        # Text edit for displaying constant details, following the current
+        # row whether it moves by mouse or keyboard
         self.details_box = QTextEdit(self)
         self.details_box.setReadOnly(True)
         self.details_box.setPlaceholderText("Select a constant to view details...")
+        self._details = None
+        self.details_timer = QTimer(self)
+        self.details_timer.setSingleShot(True)
+        self.details_timer.setInterval(DETAILS_DELAY_MS)
+        self.details_timer.timeout.connect(self.show_constant_details)
+        self.table.selectionModel().currentRowChanged.connect(lambda *_: self.details_timer.start())
+        self.lookup_timer = QTimer(self)
+        self.lookup_timer.setSingleShot(True)
+        self.lookup_timer.setInterval(LOOKUP_DWELL_MS)
+        self.lookup_timer.timeout.connect(self.record_lookup)
+        self._last_lookup = None
 
         # Buttons for features
         self.copy_button = QPushButton('Copy Selected Constant', self)
@@ -243,6 +208,27 @@ class ConstantsViewer(QWidget):
         button_layout.addWidget(self.language_button, 1, 2)
         button_layout.addWidget(self.graph_button, 1, 3)
 
+        # Widget texts in the source language, re-applied by retranslate_ui
+        self._ui_texts = [
+            (self.setWindowTitle, 'Advanced Scientific Constants Viewer'),
+            (self.file_menu.setTitle, 'File'),
+            (self.import_action.setText, 'Import Custom Constants'),
+            (self.export_action.setText, 'Export Custom Constants'),
+            (self.search_bar.setPlaceholderText, "Search for a constant..."),
+            (self.details_box.setPlaceholderText, "Select a constant to view details..."),
+            (self.copy_button.setText, 'Copy Selected Constant'),
+            (self.history_button.setText, 'View Copy History'),
+            (self.export_button.setText, 'Export Constants'),
+            (self.theme_button.setText, 'Change Theme'),
+            (self.add_custom_button.setText, 'Add Custom Constant'),
+            (self.unit_convert_button.setText, 'Unit Conversion'),
+            (self.language_button.setText, 'Change Language'),
+            (self.graph_button.setText, 'Show History Graph'),
+        ]
+        self.language = SOURCE_LANGUAGE
+        self.translate = str
+        self._localized = {SOURCE_LANGUAGE: {}}
+
         main_layout.addWidget(self.menu_bar)
         main_layout.addLayout(control_layout)
         main_layout.addWidget(self.table)
@@ -252,102 +238,358 @@ class ConstantsViewer(QWidget):
         self.setLayout(main_layout)
 
         # Variables to store history and custom constants
-        self.copy_history = []
+        self._history = None
+        self._history_dialog = None
+        self._usage = None
+        self._graph_dialog = None
         self.custom_constants = {}
 
         # Populate the table initially
         self.update_table()
+        self.start_watching()
 
-    def update_table(self):
-        # Clear the table
-        self.table.setRowCount(0)
-
-        # Get the selected category and search query
-        selected_category = self.category_box.currentText()
-        search_query = self.search_bar.text().lower()
-
-        # Populate the table with constants that match the search query
-        constants_in_category = CONSTANTS[selected_category]
-        for constant, data in constants_in_category.items():
-            if search_query in constant.lower():
-                row_position = self.table.rowCount()
-                self.table.insertRow(row_position)
-                self.table.setItem(row_position, 0, QTableWidgetItem(constant))
-                self.table.setItem(row_position, 1, QTableWidgetItem(data['value']))
-
-    def show_constant_details(self):
-     selected_items = self.constants_list_widget.selectedItems()
-     if not selected_items:
-        return
+    def start_perf_overlay(self, recorder):
+        # Event loop lag, table paint times and an overlay toggled with Ctrl+Shift+P
+        from PyQt5.QtWidgets import QShortcut
+        from perf_overlay import LagMonitor, PaintTimer, PerfOverlay
 
-     # Retrieve the selected constant name
-     constant_name = selected_items[0].text()
-     category = self.category_combobox.currentText()
+        perf.instrument(self.filter_model, ('set_rows',), 'table')
+        perf.instrument(self.search_index, ('lookup', 'fuzzy'), 'search')
+        self.lag_monitor = LagMonitor(recorder, self)
+        self.lag_monitor.start()
+        self.paint_timer = PaintTimer(recorder, 'table.paint', self)
+        self.table.viewport().installEventFilter(self.paint_timer)
+        self.perf_overlay = PerfOverlay(recorder, self)
+        QShortcut(QKeySequence('Ctrl+Shift+P'), self, self.perf_overlay.toggle)
 
-     # Ensure the constant name exists in the constants dictionary
-     if category in CONSTANTS and constant_name in CONSTANTS[category]:
-         constant_value = CONSTANTS[category][constant_name]['value']
-         description = CONSTANTS[category][constant_name].get('description', "No description available.")
+    def selected_category(self):
+        return self.category_box.currentData()
 
-        # Show the constant details in a dialog
-         QMessageBox.information(self, "Constant Details",
-                                f"Name: {constant_name}\nValue: {constant_value}\nDescription: {description}")
-     else:
-         # Handle the case where the constant name doesn't exist in the dictionary
-          QMessageBox.warning(self, "Error", f"Details for constant '{constant_name}' not found in category '{category}'.")
+    def update_table(self):
+        self.search_timer.stop()
+        self.fuzzy_timer.stop()
+
+        # Look up matches in the search index and show them in the table.
+        # Large catalogs search on the worker pool; a newer query supersedes
+        # one still running, so only the latest result reaches the table.
+        query = self.search_bar.text()
+        category = self.selected_category()
+        index = self.search_index
+        if len(self.store) < ASYNC_SEARCH_THRESHOLD:
+            self.show_search_result(index.lookup(query, category, fuzzy=False))
+            return
+        self.tasks.submit(
+            lambda progress, cancelled: index.lookup(query, category, fuzzy=False),
+            on_result=self.show_search_result,
+            key='search',
+        )
+
+    def show_search_result(self, result):
+        # The lookup only read the index; its caches are updated here
+        ids, state = result
+        self.search_index.remember(state)
+        self.filter_model.set_rows(ids)
+        if not ids and self.search_bar.text().strip():
+            self.fuzzy_timer.start()
+
+    def show_fuzzy_matches(self):
+        query = self.search_bar.text()
+        category = self.selected_category()
+        index = self.search_index
+        if len(self.store) < ASYNC_SEARCH_THRESHOLD:
+            self.filter_model.set_rows(index.fuzzy(query, category))
+            return
+        self.tasks.submit(
+            lambda progress, cancelled: index.fuzzy(query, category),
+            on_result=self.filter_model.set_rows,
+            key='search',
+        )
+
+    def start_watching(self):
+        # Reload watched catalog files when they change on disk. inotify
+        # wakes us through a socket notifier; elsewhere the files are polled.
+        # Either way a burst of writes is settled into one pass.
+        from watcher import POLL_INTERVAL_MS, SETTLE_MS, CatalogSync, CatalogWatcher, default_paths
+
+        self.watcher = CatalogWatcher(default_paths())
+        self.catalog_sync = CatalogSync()
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setSingleShot(True)
+        self.watch_timer.setInterval(SETTLE_MS)
+        self.watch_timer.timeout.connect(self.check_watched_files)
+        fd = self.watcher.fileno()
+        if fd is not None:
+            self.watch_notifier = QSocketNotifier(fd, QSocketNotifier.Read, self)
+            self.watch_notifier.activated.connect(lambda _: self.watch_timer.start())
+        else:
+            self.watch_notifier = QTimer(self)
+            self.watch_notifier.setInterval(POLL_INTERVAL_MS)
+            self.watch_notifier.timeout.connect(self.check_watched_files)
+            self.watch_notifier.start()
+        # Files already present are loaded once the window is up
+        self.watch_timer.start()
+
+    def check_watched_files(self):
+        for path in self.watcher.changes():
+            self.reload_catalog(path)
+
+    def reload_catalog(self, path):
+        # Parse on the worker pool, then apply only what changed
+        sync = self.catalog_sync
+
+        def loaded(result):
+            entries, diff = result
+            self.apply_catalog_diff(diff)
+            sync.commit(path, entries)
+
+        def failed(message):
+            # Usually a file caught mid-write; its next write triggers another pass
+            sys.stderr.write(f"Could not reload {path}: {message}\n")
+
+        self.tasks.submit(lambda progress, cancelled: sync.load(path, cancelled),
+                          on_result=loaded, on_error=failed, key=f'watch:{path}')
+
+    def apply_catalog_diff(self, diff):
+        # Apply an EntryDiff to the store, index and table without a rebuild
+        from watcher import apply_diff
+
+        if not diff:
+            return
+        # A search still running on the pool may read the index mid-change;
+        # its result is dropped and remember() ignores its stale state
+        self.tasks.cancel('search')
+        changes = apply_diff(self.store, self.search_index, diff)
+        if changes.appended:
+            self.table_model.records_appended(changes.appended)
+        if changes.updated:
+            self.table_model.records_changed(changes.updated)
+        for category in changes.new_categories:
+            self.category_box.insertItem(self.category_box.count() - 1, self.translate(category), category)
+        if self._details is not None:
+            records = self.store.records
+            changed = [records[i] for i in changes.updated]
+            changed.extend(records[len(records) - changes.appended:] if changes.appended else ())
+            self._details.invalidate(changed, changes.removed)
+        self.update_table()
+        self.show_constant_details()
+
+    def update_custom_constants(self, entries):
+        # Replace the custom constants and show them under their own category
+        from custom_io import CUSTOM_CATEGORY
+        from watcher import diff_entries
+
+        diff = diff_entries(CUSTOM_CATEGORY, self.custom_constants, entries)
+        self.custom_constants = entries
+        self.apply_catalog_diff(diff)
+
+    def selected_record(self):
+        index = self.table.selectionModel().currentIndex()
+        if not index.isValid():
+            return None
+        return self.filter_model.record(index.row())
+
+    @property
+    def details(self):
+        if self._details is None:
+            from details import DetailRenderer
+            self._details = DetailRenderer(self.store, translate=self.table_model.translate)
+        return self._details
 
+    def show_constant_details(self):
+        # Render the current constant into the details panel from the cache
+        self.details_timer.stop()
+        record = self.selected_record()
+        if record is None:
+            self.lookup_timer.stop()
+            self.details_box.clear()
+            return
+        self.details_box.setHtml(self.details.render(record))
+        if record.name != self._last_lookup:
+            self.lookup_timer.start()
+
+    def record_lookup(self):
+        # Log the constant whose details stayed on screen for LOOKUP_DWELL_MS;
+        # re-rendering the same constant does not log it again
+        record = self.selected_record()
+        if record is None or record.name == self._last_lookup:
+            return
+        self._last_lookup = record.name
+        self.history.record(record.name, record.text, kind='lookup')
 
     def copy_constant(self):
         # Get selected constant value
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        record = self.selected_record()
+        if record is None:
             QMessageBox.warning(self, "No Selection", "Please select a constant to copy.")
             return
 
-        constant_name = selected_items[0].text()
-        category = self.category_box.currentText()
-        value = CONSTANTS[category][constant_name]['value']
+        constant_name = record.name
+        value = record.text
 
         # Copy to clipboard
         clipboard = QApplication.clipboard()
         clipboard.setText(value)
 
         # Add to copy history
-        self.copy_history.append((constant_name, value))
+        self.history.record(constant_name, value)
         QMessageBox.information(self, "Copied", f"Copied {constant_name} to clipboard.")
 
+    @property
+    def history(self):
+        # The on-disk history is only read the first time it is needed. The
+        # usage aggregates are loaded with it and follow every logged event,
+        # so none is lost once it falls out of the history ring.
+        if self._history is None:
+            from history import HistoryLog
+            from usage import UsageAggregates
+            history = HistoryLog.open_default()
+            self._usage = UsageAggregates.load(self.usage_path(), history)
+            history.add_listener(lambda event: self._usage.add(event))
+            self._history = history
+        return self._history
+
+    @property
+    def usage(self):
+        # Usage aggregates are saved on exit; events logged since are replayed
+        self.history
+        return self._usage
+
+    def usage_path(self):
+        from history import data_dir
+        return os.path.join(data_dir(), 'usage.pickle')
+
     def view_history(self):
         # Display copy history
-        if not self.copy_history:
+        if not len(self.history):
             QMessageBox.information(self, "No History", "No constants have been copied yet.")
             return
+        if self._history_dialog is None:
+            self._history_dialog = self.build_history_dialog()
+        self._history_dialog.refresh()
+        self._history_dialog.show()
+        self._history_dialog.raise_()
 
-        history_text = "\n".join([f"{name}: {value}" for name, value in self.copy_history])
-        QMessageBox.information(self, "Copy History", history_text)
+    def build_history_dialog(self):
+        # Built once and kept; the table only renders the rows in view
+        from models import HistoryModel
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("History")
+        dialog.resize(700, 450)
+        layout = QVBoxLayout(dialog)
+
+        summary = QLabel(dialog)
+        model = HistoryModel(self.history, dialog)
+        view = QTableView(dialog)
+        view.setModel(model)
+        view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        view.setWordWrap(False)
+        view.verticalHeader().setVisible(False)
+        view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        view.horizontalHeader().setStretchLastSection(True)
+
+        clear_button = QPushButton("Clear History", dialog)
+
+        def refresh():
+            model.refresh()
+            top = ", ".join(f"{name} ({count})" for name, count in self.history.most_frequent(5))
+            summary.setText(f"{len(self.history)} recent copies and lookups. Most used: {top}")
+
+        def clear():
+            from usage import UsageAggregates
+
+            self.history.clear()
+            self._usage = UsageAggregates()
+            if self._graph_dialog is not None:
+                self._graph_dialog.refresh()
+            model.reload()
+            dialog.hide()
+
+        clear_button.clicked.connect(clear)
+        self.history.add_listener(lambda event: refresh() if dialog.isVisible() else None)
+        dialog.refresh = refresh
+
+        layout.addWidget(summary)
+        layout.addWidget(view)
+        layout.addWidget(clear_button)
+        return dialog
 
     def export_constants(self):
-        # Export custom constants to a JSON file
-        try:
-            file_name, _ = QFileDialog.getSaveFileName(self, "Export Constants", "", "JSON Files (*.json)")
-            if not file_name:
-                return
-            with open(file_name, 'w') as file:
-                json.dump(self.custom_constants, file)
+        # Export custom constants in the background; the format follows the file extension
+        from custom_io import write_entries
+
+        file_name, _ = QFileDialog.getSaveFileName(self, "Export Constants", "", CONSTANT_FILE_FILTER)
+        if not file_name:
+            return
+        entries = list(self.custom_constants.items())
+
+        def export(progress, cancelled):
+            write_entries(file_name, entries, len(entries), progress, cancelled)
+
+        def done(_):
             QMessageBox.information(self, "Exported", "Custom constants exported successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"An error occurred: {e}")
+
+        self.run_file_task("Exporting constants...", export, done)
 
     def import_constants(self):
-        # Import custom constants from a JSON file
-        try:
-            file_name, _ = QFileDialog.getOpenFileName(self, "Import Constants", "", "JSON Files (*.json)")
-            if not file_name:
-                return
-            with open(file_name, 'r') as file:
-                self.custom_constants = json.load(file)
-            QMessageBox.information(self, "Imported", "Custom constants imported successfully.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"An error occurred: {e}")
+        # Stream custom constants in the background and merge them into the current set
+        from custom_io import iter_entries, merge_entries
+
+        file_name, _ = QFileDialog.getOpenFileName(self, "Import Constants", "", CONSTANT_FILE_FILTER)
+        if not file_name:
+            return
+        existing = self.custom_constants
+
+        def load(progress, cancelled):
+            return merge_entries(existing, iter_entries(file_name, progress, cancelled))
+
+        def done(report):
+            replace = False
+            if report.conflicts:
+                names = ", ".join(sorted(report.conflicts)[:10])
+                answer = QMessageBox.question(
+                    self, "Conflicting Constants",
+                    f"{len(report.conflicts)} imported constants differ from existing ones ({names}). "
+                    "Replace the existing values?",
+                )
+                replace = answer == QMessageBox.Yes
+            entries = dict(self.custom_constants)
+            report.apply(entries, replace)
+            self.update_custom_constants(entries)
+            QMessageBox.information(self, "Imported", f"Custom constants imported: {report.summary()}.")
+
+        self.run_file_task("Importing constants...", load, done)
+
+    def run_file_task(self, label, function, on_success):
+        # Run `function(progress, cancelled)` on the worker pool behind a progress dialog
+        progress_dialog = QProgressDialog(label, "Cancel", 0, 100, self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(300)
+
+        def finished(result):
+            progress_dialog.reset()
+            on_success(result)
+
+        def failed(message):
+            progress_dialog.reset()
+            QMessageBox.critical(self, "Error", f"An error occurred: {message}")
+
+        token = self.tasks.submit(function, on_result=finished, on_error=failed,
+                                  on_progress=progress_dialog.setValue)
+        progress_dialog.canceled.connect(token.cancel)
+
+    def closeEvent(self, event):
+        # Stop background work before the window and its models go away
+        self.tasks.shutdown()
+        self.watcher.close()
+        if self._usage is not None:
+            try:
+                self._usage.save(self.usage_path())
+            except OSError:
+                # Only costs a replay of the history log on the next start
+                pass
+        super().closeEvent(event)
 
     def change_theme(self):
         # Allow users to choose a theme color
@@ -380,26 +622,290 @@ class ConstantsViewer(QWidget):
 
     def save_custom_constant(self, dialog, name, value, description):
         if name and value:
-            self.custom_constants[name] = {'value': value, 'description': description}
+            self.update_custom_constants({**self.custom_constants, name: {'value': value, 'description': description}})
             QMessageBox.information(self, "Success", f"Custom constant '{name}' added.")
             dialog.accept()
         else:
             QMessageBox.warning(self, "Incomplete Data", "Please provide both a name and value for the constant.")
 
     def unit_conversion(self):
-        # Dummy unit conversion feature
-        QMessageBox.information(self, "Unit Conversion", "This feature is under development.")
+        # Dialog to convert the selected constant (or any typed value) between units
+        record = self.selected_record()
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Unit Conversion")
+        form_layout = QFormLayout(dialog)
+
+        value_input = QLineEdit(dialog)
+        from_input = QLineEdit(dialog)
+        to_input = QComboBox(dialog)
+        to_input.setEditable(True)
+        result_label = QLabel(dialog)
+        result_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+
+        if record is not None and record.numeric:
+            value_input.setText(repr(record.value))
+            from_input.setText(record.unit_text)
+            dialog.setWindowTitle(f"Unit Conversion - {record.name}")
+
+        def refresh_targets():
+            try:
+                targets = compatible_units(from_input.text())
+            except UnitError:
+                targets = []
+            current = to_input.currentText()
+            to_input.blockSignals(True)
+            to_input.clear()
+            to_input.addItems(targets)
+            to_input.setEditText(current)
+            to_input.blockSignals(False)
+
+        def convert():
+            try:
+                value = float(value_input.text())
+                conversion = compile_conversion(from_input.text(), to_input.currentText())
+            except ValueError as e:
+                result_label.setText(str(e) if isinstance(e, UnitError) else "Enter a numeric value.")
+                return
+            result_label.setText(f"{conversion(value):.10g} {to_input.currentText()}")
+
+        value_input.textChanged.connect(convert)
+        from_input.textChanged.connect(refresh_targets)
+        from_input.textChanged.connect(convert)
+        to_input.editTextChanged.connect(convert)
+
+        form_layout.addRow("Value:", value_input)
+        form_layout.addRow("From unit:", from_input)
+        form_layout.addRow("To unit:", to_input)
+        form_layout.addRow("Result:", result_label)
+
+        refresh_targets()
+        convert()
+        dialog.setLayout(form_layout)
+        dialog.exec_()
 
     def change_language(self):
-        # Dummy change language feature
-        QMessageBox.information(self, "Change Language", "This feature is under development.")
+        from i18n import LANGUAGES
+
+        codes = list(LANGUAGES)
+        name, ok = QInputDialog.getItem(self, self.translate("Change Language"), self.translate("Language:"),
+                                        list(LANGUAGES.values()), codes.index(self.language), False)
+        if ok:
+            self.set_language(codes[list(LANGUAGES.values()).index(name)])
+
+    def set_language(self, language):
+        # Switch names, descriptions and UI strings in place. The table only
+        # repaints, and the search index re-posts just the translated records;
+        # each language's catalog is compiled and mapped on first use.
+        from i18n import TranslationError, localized_texts, translations
+
+        if language == self.language:
+            return
+        try:
+            catalog = translations(language)
+            texts = self._localized.get(language)
+            if texts is None:
+                texts = self._localized[language] = localized_texts(self.store, catalog)
+        except (OSError, TranslationError) as e:
+            QMessageBox.warning(self, "Change Language", str(e))
+            return
+        self.language = language
+        self.translate = catalog.gettext if catalog is not None else str
+        translate = catalog.gettext if catalog is not None else None
+
+        # Drop the result of a search that may read the index mid-update
+        self.tasks.cancel('search')
+        self.search_index.localize(texts)
+        self.table_model.set_translate(translate)
+        if self._details is not None:
+            self._details.set_translate(translate)
+        self.retranslate_ui()
+        self.update_table()
+        self.show_constant_details()
+
+    def retranslate_ui(self):
+        for setter, text in self._ui_texts:
+            setter(self.translate(text))
+        for i in range(self.category_box.count()):
+            category = self.category_box.itemData(i)
+            self.category_box.setItemText(i, self.translate(ALL_CATEGORIES if category is None else category))
 
     def show_history_graph(self):
-        # Dummy history graph feature
-        QMessageBox.information(self, "History Graph", "This feature is under development.")
+        # Chart of constant usage over time, kept current while it is open,
+        # and of the selected constant's value across CODATA releases
+        if self._graph_dialog is None:
+            self._graph_dialog = self.build_graph_dialog()
+        self._graph_dialog.refresh()
+        self._graph_dialog.show()
+        self._graph_dialog.raise_()
+
+    def build_graph_dialog(self):
+        # The chart reads pre-aggregated buckets, so redraws never scan the log
+        from charts import TimeSeriesChart
+        from releases import ReleaseStore
+        from usage import lttb
 
-if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    viewer = ConstantsViewer()
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Usage Graph")
+        dialog.resize(800, 450)
+        layout = QVBoxLayout(dialog)
+
+        controls = QHBoxLayout()
+        constant_box = QComboBox(dialog)
+        range_box = QComboBox(dialog)
+        for label, seconds in GRAPH_RANGES:
+            range_box.addItem(label, seconds)
+        range_box.setCurrentIndex(len(GRAPH_RANGES) - 1)
+        kind_box = QComboBox(dialog)
+        for label, kind in GRAPH_KINDS:
+            kind_box.addItem(label, kind)
+        controls.addWidget(QLabel("Constant:", dialog))
+        controls.addWidget(constant_box, 1)
+        controls.addWidget(kind_box)
+        controls.addWidget(QLabel("Range:", dialog))
+        controls.addWidget(range_box)
+
+        summary = QLabel(dialog)
+        chart = TimeSeriesChart(parent=dialog)
+        chart.y_label = "uses per bucket"
+
+        releases = ReleaseStore(self.store)
+        revision_label = QLabel(dialog)
+        revision_label.setWordWrap(True)
+        revision_chart = TimeSeriesChart(style='line', parent=dialog)
+        revision_chart.time_axis = False
+        revision_chart.y_label = f"ppm vs CODATA {releases.releases[-1]}"
+
+        def selected_name():
+            return constant_box.currentData()
+
+        def fetch(start, end, width):
+            return self.usage.series(start, end, width, selected_name(), kind_box.currentData())
+
+        def update_summary():
+            summary.setText(f"{self.usage.count(kind=kind_box.currentData())} recorded uses")
+
+        def fetch_revisions(start, end, width):
+            # Relative change of the selected constant across releases
+            name = selected_name()
+            points = [(int(release), record.value) for release in releases.releases
+                      for record in [releases.at(name, release)] if record is not None and record.numeric]
+            if not points or not points[-1][1]:
+                return [], []
+            latest = points[-1][1]
+            return lttb([x for x, _ in points], [(value / latest - 1) * 1e6 for _, value in points], width)
+
+        def update_revisions():
+            name = selected_name()
+            history = releases.history(name) if name else []
+            versioned = len(history) > 1
+            revision_chart.setVisible(versioned)
+            revision_label.setVisible(versioned)
+            if versioned:
+                revision_label.setText("Value by CODATA release: " + ", ".join(
+                    f"{release}: {record.text}" for release, record in history))
+                revision_chart.set_range(int(releases.releases[0]) - 1, int(releases.releases[-1]) + 1)
+
+        def update_range():
+            update_revisions()
+            seconds = range_box.currentData()
+            if seconds:
+                end = time.time()
+                chart.set_range(end - seconds, end)
+                return
+            span = self.usage.time_range(selected_name(), kind_box.currentData())
+            if span is None:
+                chart.set_range(0, 0)
+            else:
+                chart.set_range(span[0], max(span[1], span[0] + 60))
+
+        def refresh():
+            # Rebuild the constant list, most used first, keeping the selection
+            current = selected_name()
+            constant_box.blockSignals(True)
+            constant_box.clear()
+            constant_box.addItem("All Constants", None)
+            for name, count in self.history.most_frequent(50):
+                constant_box.addItem(f"{name} ({count})", name)
+            # Versioned constants are listed even if unused, for their revisions
+            for record in releases.versioned():
+                if constant_box.findData(record.name) < 0:
+                    constant_box.addItem(record.name, record.name)
+            position = constant_box.findData(current)
+            constant_box.setCurrentIndex(max(position, 0))
+            constant_box.blockSignals(False)
+            update_summary()
+            update_range()
+
+        def on_event(event):
+            if not dialog.isVisible():
+                return
+            update_summary()
+            if range_box.currentData():
+                # Slide a relative window forward; invalidate() coalesces bursts
+                end = time.time()
+                chart.start, chart.end = end - range_box.currentData(), end
+            elif event.timestamp >= chart.end:
+                chart.end = event.timestamp + 60
+            chart.invalidate()
+
+        chart.set_fetch(fetch, 'bars')
+        revision_chart.set_fetch(fetch_revisions)
+        constant_box.currentIndexChanged.connect(update_range)
+        range_box.currentIndexChanged.connect(update_range)
+        kind_box.currentIndexChanged.connect(update_summary)
+        kind_box.currentIndexChanged.connect(update_range)
+        # Registered after the usage listener, so aggregates are current here
+        self.usage
+        self.history.add_listener(on_event)
+        dialog.refresh = refresh
+
+        layout.addLayout(controls)
+        layout.addWidget(chart, 2)
+        layout.addWidget(summary)
+        layout.addWidget(revision_label)
+        layout.addWidget(revision_chart, 1)
+        return dialog
+
+def main(argv=None):
+    argv = list(sys.argv if argv is None else argv)
+    profile = None
+    if '--profile-startup' in argv:
+        argv.remove('--profile-startup')
+        profile = StartupProfile()
+    # --perf times slots, tasks and repaints; --perf-trace FILE (or
+    # SCIENTIFIC_CONSTANTS_PERF_TRACE) also writes a Chrome trace on exit
+    trace_path = os.environ.get('SCIENTIFIC_CONSTANTS_PERF_TRACE')
+    if '--perf-trace' in argv:
+        i = argv.index('--perf-trace')
+        trace_path = argv[i + 1] if i + 1 < len(argv) else 'constants-trace.json'
+        del argv[i:i + 2]
+    if '--perf' in argv:
+        argv.remove('--perf')
+        perf.enable()
+    if trace_path:
+        perf.enable()
+
+    app = QApplication(argv)
+    if profile is not None:
+        profile.mark('create QApplication')
+    viewer = ConstantsViewer(profile)
     viewer.show()
-    sys.exit(app.exec_())
+    if profile is not None:
+        profile.mark('show window')
+
+        def first_pass():
+            profile.mark('first event loop pass')
+            profile.report()
+
+        QTimer.singleShot(0, first_pass)
+    status = app.exec_()
+    if trace_path:
+        try:
+            perf.recorder.write_trace(trace_path)
+        except OSError as e:
+            sys.stderr.write(f"Could not write trace to {trace_path}: {e}\n")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,274 @@
+import time
+
+from PyQt5.QtCore import QAbstractProxyModel, QAbstractTableModel, QModelIndex, Qt
+
+COLUMNS = ('Constant', 'Value')
+RecordRole = Qt.UserRole + 1
+
+
+class ConstantsTableModel(QAbstractTableModel):
+    # Exposes every record of a ConstantStore; row i is the record with id i
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        # Display names, descriptions and headers go through this gettext-style callable
+        self.translate = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def record_data(self, row, column, role):
+        record = self.store.records[row]
+        if role == Qt.DisplayRole:
+            if column:
+                return record.text
+            return self.translate(record.name) if self.translate else record.name
+        if role == Qt.ToolTipRole:
+            return self.translate(record.description) if self.translate and record.description else record.description
+        if role == RecordRole:
+            return record
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        return self.record_data(index.row(), index.column(), role)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.translate(COLUMNS[section]) if self.translate else COLUMNS[section]
+        return None
+
+    def set_translate(self, translate):
+        # Relabel in place: views repaint the visible cells, nothing is rebuilt
+        self.translate = translate
+        rows = len(self.store.records)
+        if rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(rows - 1, 0), [Qt.DisplayRole, Qt.ToolTipRole])
+        self.headerDataChanged.emit(Qt.Horizontal, 0, len(COLUMNS) - 1)
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable if index.isValid() else Qt.NoItemFlags
+
+    def records_appended(self, count):
+        # Call after appending `count` records to the store
+        end = len(self.store.records)
+        self.beginInsertRows(QModelIndex(), end - count, end - 1)
+        self.endInsertRows()
+
+    def records_changed(self, ids):
+        # Call after records were rewritten in place; one signal per run of ids
+        ids = sorted(ids)
+        start = 0
+        for i in range(1, len(ids) + 1):
+            if i == len(ids) or ids[i] != ids[i - 1] + 1:
+                self.dataChanged.emit(self.index(ids[start], 0), self.index(ids[i - 1], len(COLUMNS) - 1))
+                start = i
+
+
+class ConstantsFilterModel(QAbstractProxyModel):
+    # Shows an ordered subset of the source rows. When a new filter only
+    # narrows or only widens the current rows, just the affected runs are
+    # removed or inserted, so views keep their selection and scroll position
+    # and never rebuild rows that did not change.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._proxy_rows = None
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        super().setSourceModel(model)
+        self._rows = list(range(model.rowCount()))
+        self._proxy_rows = None
+        self.endResetModel()
+        model.dataChanged.connect(self._source_data_changed)
+        model.headerDataChanged.connect(self.headerDataChanged)
+
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        # Forward edits to the rows currently shown; a change to every source
+        # row is forwarded as one signal
+        if bottom_right.row() - top_left.row() + 1 >= self.sourceModel().rowCount():
+            if self._rows:
+                self.dataChanged.emit(self.index(0, 0), self.index(len(self._rows) - 1, len(COLUMNS) - 1), roles)
+            return
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            index = self.mapFromSource(self.sourceModel().index(row, 0))
+            if index.isValid():
+                self.dataChanged.emit(index, index.sibling(index.row(), len(COLUMNS) - 1))
+
+    def source_rows(self):
+        return self._rows
+
+    def record(self, row):
+        return self.sourceModel().store.records[self._rows[row]]
+
+    def set_rows(self, rows):
+        # A copy, so a range (an unfiltered scope) compares equal to the
+        # current rows and a caller's list is never edited in place
+        rows = list(rows)
+        old = self._rows
+        if rows == old:
+            return
+        if len(rows) < len(old) and _is_subsequence(rows, old):
+            self._remove_runs(set(rows))
+        elif len(rows) > len(old) and _is_subsequence(old, rows):
+            self._insert_runs(rows)
+        else:
+            self.beginResetModel()
+            self._rows = rows
+            self._proxy_rows = None
+            self.endResetModel()
+
+    def _remove_runs(self, keep):
+        # Walk backwards so earlier proxy rows keep their positions
+        rows = self._rows
+        end = len(rows) - 1
+        while end >= 0:
+            if rows[end] in keep:
+                end -= 1
+                continue
+            start = end
+            while start > 0 and rows[start - 1] not in keep:
+                start -= 1
+            self.beginRemoveRows(QModelIndex(), start, end)
+            del rows[start:end + 1]
+            self._proxy_rows = None
+            self.endRemoveRows()
+            end = start - 1
+
+    def _insert_runs(self, new_rows):
+        # Walk forwards; `position` is where the next new run goes
+        rows = self._rows
+        position = 0
+        i = 0
+        while i < len(new_rows):
+            if position < len(rows) and rows[position] == new_rows[i]:
+                position += 1
+                i += 1
+                continue
+            start = i
+            while i < len(new_rows) and (position >= len(rows) or new_rows[i] != rows[position]):
+                i += 1
+            self.beginInsertRows(QModelIndex(), position, position + i - start - 1)
+            rows[position:position] = new_rows[start:i]
+            self._proxy_rows = None
+            self.endInsertRows()
+            position += i - start
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(COLUMNS)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._rows) and 0 <= column < len(COLUMNS)):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._proxy_rows is None:
+            self._proxy_rows = {source: row for row, source in enumerate(self._rows)}
+        row = self._proxy_rows.get(source_index.row())
+        if row is None:
+            return QModelIndex()
+        return self.createIndex(row, source_index.column())
+
+    def data(self, index, role=Qt.DisplayRole):
+        # Skip the source QModelIndex round trip; only visible cells get here
+        if not index.isValid():
+            return None
+        return self.sourceModel().record_data(self._rows[index.row()], index.column(), role)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        return section + 1 if role == Qt.DisplayRole else None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable if index.isValid() else Qt.NoItemFlags
+
+
+class HistoryModel(QAbstractTableModel):
+    # Read-only view of a HistoryLog, newest first. Rows are fetched from the
+    # ring buffer by index when the view paints them, so opening the history
+    # costs the same whatever its length.
+    HEADERS = ('Time', 'Action', 'Constant', 'Value', 'Times used')
+    KINDS = {'copy': 'Copied', 'lookup': 'Looked up'}
+
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self._rows = len(history)
+        self._seen = history.recorded
+
+    def reload(self):
+        self.beginResetModel()
+        self._rows = len(self.history)
+        self._seen = self.history.recorded
+        self.endResetModel()
+
+    def refresh(self):
+        # Call after events are recorded. New events are inserted at the top
+        # and events that fell out of the ring are removed from the bottom.
+        added = self.history.recorded - self._seen
+        self._seen = self.history.recorded
+        if added <= 0:
+            return
+        total = len(self.history)
+        if added >= total:
+            self.reload()
+            return
+        overflow = self._rows + added - total
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), self._rows - overflow, self._rows - 1)
+            self._rows -= overflow
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), 0, added - 1)
+        self._rows += added
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        event = self.history.newest(index.row())
+        column = index.column()
+        if column == 0:
+            return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.timestamp))
+        if column == 1:
+            return self.KINDS.get(event.kind, event.kind)
+        if column == 2:
+            return event.name
+        if column == 3:
+            return event.value
+        return self.history.frequency(event.name)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+
+def _is_subsequence(short, long):
+    it = iter(long)
+    return all(item in it for item in short)
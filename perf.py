@@ -0,0 +1,203 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+from inspect import Parameter, signature
+
+from files import atomic_write
+
+# Timed spans and counter samples kept for the trace; older ones are dropped
+MAX_EVENTS = 200000
+
+# The active Recorder, or None. Everything in this module checks it first,
+# so with instrumentation off the hooks cost one global lookup.
+recorder = None
+
+
+class Stat:
+    __slots__ = ('count', 'total_ns', 'max_ns', 'last_ns')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.last_ns = 0
+
+    def add(self, duration):
+        self.count += 1
+        self.total_ns += duration
+        self.last_ns = duration
+        if duration > self.max_ns:
+            self.max_ns = duration
+
+    @property
+    def mean_ns(self):
+        return self.total_ns / self.count if self.count else 0.0
+
+
+class Recorder:
+    # Collects timed spans (name, start, duration, thread), counters and
+    # sampled gauges such as event loop lag. Safe to call from worker threads.
+    def __init__(self, max_events=MAX_EVENTS):
+        self.origin = time.perf_counter_ns()
+        self.spans = deque(maxlen=max_events)
+        self.samples = deque(maxlen=max_events)
+        self.stats = {}
+        self.counters = {}
+        self.gauges = {}
+        self.peaks = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, start, end):
+        duration = end - start
+        with self._lock:
+            self.spans.append((name, start, duration, threading.get_ident()))
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = Stat()
+            stat.add(duration)
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def sample(self, name, value):
+        # A gauge reading; its high-water mark is kept alongside
+        with self._lock:
+            self.samples.append((name, time.perf_counter_ns(), value))
+            self.gauges[name] = value
+            if value > self.peaks.get(name, value - 1):
+                self.peaks[name] = value
+
+    def summary(self):
+        # [(name, Stat)] with the most total time first
+        with self._lock:
+            return sorted(self.stats.items(), key=lambda item: item[1].total_ns, reverse=True)
+
+    def trace(self):
+        # Chrome trace event format (chrome://tracing, Perfetto); times in µs
+        with self._lock:
+            spans = list(self.spans)
+            samples = list(self.samples)
+            counters = dict(self.counters)
+        pid = os.getpid()
+        threads = {threading.main_thread().ident: 0}
+        events = []
+        for name, start, duration, thread in spans:
+            tid = threads.setdefault(thread, len(threads))
+            events.append({'name': name, 'cat': name.partition(':')[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+                           'ts': (start - self.origin) / 1000, 'dur': duration / 1000})
+        for name, timestamp, value in samples:
+            events.append({'name': name, 'ph': 'C', 'pid': pid, 'tid': 0,
+                           'ts': (timestamp - self.origin) / 1000, 'args': {'value': value}})
+        for thread, tid in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                           'args': {'name': 'GUI' if tid == 0 else f'worker {tid}'}})
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'counters': counters, 'peaks': dict(self.peaks)},
+        }
+
+    def write_trace(self, path):
+        with atomic_write(path, 'w', encoding='utf-8') as file:
+            json.dump(self.trace(), file)
+
+
+class _Span:
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.add(self.name, self.start, time.perf_counter_ns())
+
+
+_NULL_SPAN = nullcontext()
+
+
+def enable(max_events=MAX_EVENTS):
+    global recorder
+    if recorder is None:
+        recorder = Recorder(max_events)
+    return recorder
+
+
+def disable():
+    global recorder
+    recorder = None
+
+
+def span(name):
+    # `with perf.span('name'):` times the block when instrumentation is on
+    return recorder.span(name) if recorder is not None else _NULL_SPAN
+
+
+def count(name, n=1):
+    if recorder is not None:
+        recorder.count(name, n)
+
+
+def timed(function, name):
+    # Wrap `function` so each call is recorded as `name`. Extra positional
+    # arguments are dropped the way PyQt does for slots, so a wrapped slot
+    # still connects to signals that pass more arguments than it takes.
+    try:
+        parameters = signature(function).parameters.values()
+    except (TypeError, ValueError):
+        limit = None
+    else:
+        if any(p.kind == Parameter.VAR_POSITIONAL for p in parameters):
+            limit = None
+        else:
+            limit = sum(p.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD) for p in parameters)
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        active = recorder
+        if limit is not None:
+            args = args[:limit]
+        if active is None:
+            return function(*args, **kwargs)
+        start = time.perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            active.add(name, start, time.perf_counter_ns())
+
+    return wrapper
+
+
+def instrument(obj, names, prefix=None):
+    # Replace the named methods on one object with timed wrappers. Call this
+    # before the methods are connected to signals; with instrumentation off
+    # it does nothing, so the methods stay untouched.
+    if recorder is None:
+        return
+    prefix = prefix or type(obj).__name__
+    for name in names:
+        setattr(obj, name, timed(getattr(obj, name), f'{prefix}.{name}'))
+
+
+def peak_memory():
+    # Peak resident set size of this process in bytes, or None where unknown
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
@@ -0,0 +1,125 @@
+import time
+from html import escape
+
+from PyQt5.QtCore import QElapsedTimer, QEvent, QObject, Qt, QTimer
+from PyQt5.QtWidgets import QApplication, QLabel
+
+from perf import peak_memory
+
+LAG_INTERVAL_MS = 100
+# Peak memory is read every this many lag samples
+MEMORY_EVERY = 10
+OVERLAY_REFRESH_MS = 500
+OVERLAY_ROWS = 8
+
+
+class LagMonitor(QObject):
+    # Event loop responsiveness: a timer asks to run every LAG_INTERVAL_MS
+    # and records how late it actually ran. Also samples peak memory.
+    def __init__(self, recorder, parent=None, interval_ms=LAG_INTERVAL_MS):
+        super().__init__(parent)
+        self.recorder = recorder
+        self.interval_ms = interval_ms
+        self._ticks = 0
+        self._clock = QElapsedTimer()
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._tick)
+
+    def start(self):
+        self._clock.start()
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def _tick(self):
+        lag = max(0, self._clock.restart() - self.interval_ms)
+        self.recorder.sample('event loop lag (ms)', lag)
+        self._ticks += 1
+        if self._ticks % MEMORY_EVERY == 1:
+            peak = peak_memory()
+            if peak is not None:
+                self.recorder.sample('peak memory (MiB)', round(peak / (1 << 20), 1))
+
+
+class PaintTimer(QObject):
+    # Times paint events of a widget (e.g. a table viewport). The event is
+    # re-sent from the filter with the filter bypassed, so the measured span
+    # covers the widget's own painting, then the original delivery is dropped.
+    def __init__(self, recorder, name, parent=None):
+        super().__init__(parent)
+        self.recorder = recorder
+        self.name = name
+        self._inside = False
+
+    def eventFilter(self, watched, event):
+        if event.type() != QEvent.Paint or self._inside:
+            return False
+        self._inside = True
+        start = time.perf_counter_ns()
+        try:
+            QApplication.sendEvent(watched, event)
+        finally:
+            self._inside = False
+            self.recorder.add(self.name, start, time.perf_counter_ns())
+        return True
+
+
+class PerfOverlay(QLabel):
+    # Semi-transparent stats panel over the top-right corner of its parent:
+    # the slowest spans by total time, event loop lag and peak memory.
+    def __init__(self, recorder, parent):
+        super().__init__(parent)
+        self.recorder = recorder
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setTextFormat(Qt.RichText)
+        self.setStyleSheet(
+            'QLabel { background: rgba(0, 0, 0, 170); color: #e0e0e0; '
+            'font-family: monospace; font-size: 11px; padding: 6px; }'
+        )
+        self._timer = QTimer(self)
+        self._timer.setInterval(OVERLAY_REFRESH_MS)
+        self._timer.timeout.connect(self.refresh)
+        parent.installEventFilter(self)
+        self.hide()
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+
+    def setVisible(self, visible):
+        super().setVisible(visible)
+        if visible:
+            self.refresh()
+            self.raise_()
+            self._timer.start()
+        else:
+            self._timer.stop()
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Resize:
+            self._place()
+        return False
+
+    def _place(self):
+        self.adjustSize()
+        parent = self.parentWidget()
+        self.move(parent.width() - self.width() - 8, 8)
+
+    def refresh(self):
+        recorder = self.recorder
+        rows = ['<table cellspacing="0">',
+                '<tr><th align="left">span</th><th>n</th><th>avg ms</th><th>max ms</th></tr>']
+        for name, stat in recorder.summary()[:OVERLAY_ROWS]:
+            rows.append(f'<tr><td>{escape(name)}&nbsp;</td><td align="right">{stat.count}</td>'
+                        f'<td align="right">{stat.mean_ns / 1e6:.2f}</td>'
+                        f'<td align="right">{stat.max_ns / 1e6:.1f}</td></tr>')
+        rows.append('</table>')
+        for gauge in ('event loop lag (ms)', 'peak memory (MiB)'):
+            if gauge in recorder.gauges:
+                rows.append(f'{escape(gauge)}: {recorder.gauges[gauge]} (max {recorder.peaks[gauge]})<br>')
+        for name, value in sorted(recorder.counters.items()):
+            rows.append(f'{escape(name)}: {value}<br>')
+        self.setText(''.join(rows))
+        self._place()
@@ -0,0 +1,320 @@
+import math
+import re
+from array import array
+from decimal import Decimal
+
+from units import UnitError, parse_unit
+
+PI = Decimal('3.141592653589793238462643383279502884')
+
+_VALUE_RE = re.compile(
+    r'^\s*(?P<sign>[-+−]?)'
+    r'(?P<mantissa>(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d*)?|\.\d+)'
+    r'(?:\((?P<concise>\d+)\))?'
+    r'(?P<pi>π)?'
+    r'(?:\s*(?:×|x|\*)\s*10\^?(?P<exponent>[-+−]?\d+))?'
+    r'(?:\s*(?:±|\+/-)\s*(?P<plusminus>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?))?'
+    r'(?P<unit>.*)$'
+)
+
+
+def parse_value(text):
+    # Split a display string like '6.67430(15) × 10^-11 m^3 kg^-1 s^-2' into
+    # (mantissa, exponent, uncertainty, unit). Returns None for symbolic values
+    # such as '8πGρ/3 - Λ' that have no single numeric reading.
+    match = _VALUE_RE.match(text or '')
+    if not match:
+        return None
+    try:
+        unit = parse_unit(match.group('unit'))
+    except UnitError:
+        return None
+
+    digits = match.group('mantissa').replace(',', '')
+    mantissa = Decimal(digits)
+    if match.group('sign') in ('-', '−'):
+        mantissa = -mantissa
+    exponent = int(match.group('exponent').replace('−', '-')) if match.group('exponent') else 0
+
+    uncertainty = 0.0
+    if match.group('concise'):
+        # Concise notation: the bracketed digits apply to the last decimal places
+        decimals = len(digits.partition('.')[2])
+        uncertainty = float(Decimal(match.group('concise')).scaleb(exponent - decimals))
+    elif match.group('plusminus'):
+        uncertainty = float(Decimal(match.group('plusminus')).scaleb(exponent))
+
+    if match.group('pi'):
+        mantissa = mantissa * PI
+        uncertainty *= math.pi
+    return mantissa, exponent, uncertainty, unit
+
+
+class Constant:
+    # One parsed constant. Records are interned, so a constant listed under
+    # several categories is a single object whose `categories` holds them all.
+    __slots__ = ('id', 'name', 'text', 'description', 'value', 'mantissa',
+                 'exponent', 'uncertainty', 'unit', 'categories')
+
+    def __init__(self, id, name, text, description, categories=()):
+        self.id = id
+        self.name = name
+        self.text = text
+        self.description = description
+        self.categories = set(categories)
+
+        parsed = parse_value(text)
+        if parsed is None:
+            self.mantissa = None
+            self.exponent = 0
+            self.uncertainty = math.nan
+            self.unit = None
+            self.value = math.nan
+        else:
+            self.mantissa, self.exponent, self.uncertainty, self.unit = parsed
+            self.value = float(self.mantissa.scaleb(self.exponent))
+
+    def __repr__(self):
+        return f'Constant({self.name!r}, {self.text!r})'
+
+    @property
+    def numeric(self):
+        return self.mantissa is not None
+
+    @property
+    def decimal(self):
+        # Exact decimal value as written, for high precision work
+        if self.mantissa is None:
+            return None
+        return self.mantissa.scaleb(self.exponent)
+
+    @property
+    def unit_text(self):
+        return self.unit.symbol if self.unit is not None else ''
+
+    @property
+    def dims(self):
+        return self.unit.dims if self.unit is not None else None
+
+    def as_dict(self):
+        return {'value': self.text, 'description': self.description}
+
+
+class ConstantStore:
+    # Parsed constants with numeric columns kept in flat arrays, indexed by
+    # record id. Ids are never reused: a record removed from its last
+    # category is retired in place, so ids stay valid as table rows.
+    def __init__(self):
+        self.records = []
+        self.values = array('d')
+        self.uncertainties = array('d')
+        self.scales = array('d')
+        self.exponents = array('i')
+        self.dimensions = array('b')
+        self._by_name = {}
+        self._by_key = {}
+        self._interned = {}
+        self._categories = {}
+        # Other live records sharing a name with the _by_name entry
+        self._homonyms = {}
+        self._retired = 0
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        store = cls()
+        for category, entries in mapping.items():
+            for name, data in entries.items():
+                store.add(category, name, data['value'], data.get('description', ''))
+        return store
+
+    def add(self, category, name, value, description=''):
+        # Identical entries under different categories share one record
+        key = (name, value, description)
+        record = self._interned.get(key)
+        if record is None:
+            record = Constant(len(self.records), name, value, description)
+            self._append(record)
+            self._intern(record)
+
+        members = self._categories.setdefault(category, [])
+        if category not in record.categories:
+            record.categories.add(category)
+            members.append(record.id)
+        return record
+
+    def _intern(self, record):
+        self._interned[(record.name, record.text, record.description)] = record
+        if self._by_name.setdefault(record.name, record) is not record:
+            self._homonyms.setdefault(record.name, []).append(record)
+        self._by_key.setdefault(record.name.casefold(), record)
+
+    def _retire(self, record):
+        # Forget `record` by name; its id and columns stay allocated
+        name = record.name
+        del self._interned[(name, record.text, record.description)]
+        others = self._homonyms.get(name, [])
+        if self._by_name.get(name) is record:
+            if others:
+                self._by_name[name] = others.pop(0)
+            else:
+                del self._by_name[name]
+        elif record in others:
+            others.remove(record)
+        if not others:
+            self._homonyms.pop(name, None)
+        key = name.casefold()
+        if self._by_key.get(key) is record:
+            replacement = self._by_name.get(name)
+            if replacement is not None:
+                self._by_key[key] = replacement
+            else:
+                del self._by_key[key]
+
+    def _find(self, category, name):
+        # Exact-name lookup within one category
+        record = self._by_name.get(name)
+        if record is not None and category in record.categories:
+            return record
+        for other in self.category(category):
+            if other.name == name:
+                return other
+        return None
+
+    def remove(self, category, name):
+        # Drop `name` from `category`; returns the record or None. A record
+        # left without categories is retired.
+        record = self._find(category, name)
+        if record is None:
+            return None
+        record.categories.discard(category)
+        self._categories[category].remove(record.id)
+        if not record.categories:
+            self._retire(record)
+            self._retired += 1
+        return record
+
+    def update(self, category, name, value, description=''):
+        # Set the value of `name` in `category`, returning (old, new) records.
+        # A record only this category uses is rewritten under the same id, so
+        # views keep their rows; a shared one is left to its other categories.
+        old = self._find(category, name)
+        if old is None:
+            return None, self.add(category, name, value, description)
+        if old.text == value and old.description == description:
+            return old, old
+        if old.categories != {category} or (name, value, description) in self._interned:
+            self.remove(category, name)
+            return old, self.add(category, name, value, description)
+        record = Constant(old.id, name, value, description, old.categories)
+        self._retire(old)
+        self.records[old.id] = record
+        self._set_columns(record)
+        self._intern(record)
+        return old, record
+
+    def _set_columns(self, record):
+        i = record.id
+        self.values[i] = record.value
+        self.uncertainties[i] = record.uncertainty
+        self.exponents[i] = record.exponent
+        if record.unit is not None:
+            self.scales[i] = record.unit.scale
+            self.dimensions[i * 7:i * 7 + 7] = array('b', record.unit.dims)
+        else:
+            self.scales[i] = math.nan
+            self.dimensions[i * 7:i * 7 + 7] = array('b', (0,) * 7)
+
+    def _append(self, record):
+        self.records.append(record)
+        self.values.append(record.value)
+        self.uncertainties.append(record.uncertainty)
+        self.exponents.append(record.exponent)
+        if record.unit is not None:
+            self.scales.append(record.unit.scale)
+            self.dimensions.extend(record.unit.dims)
+        else:
+            self.scales.append(math.nan)
+            self.dimensions.extend((0,) * 7)
+
+    def __len__(self):
+        return len(self.records) - self._retired
+
+    def __iter__(self):
+        if not self._retired:
+            return iter(self.records)
+        return (record for record in self.records if record.categories)
+
+    def __contains__(self, name):
+        return name in self._by_name or name.casefold() in self._by_key
+
+    def categories(self):
+        return list(self._categories)
+
+    def category(self, category):
+        records = self.records
+        return [records[i] for i in self._categories.get(category, ())]
+
+    def category_ids(self, category):
+        return self._categories.get(category, [])
+
+    def get(self, name, category=None, default=None):
+        # Exact name first, then a case-insensitive match
+        record = self._by_name.get(name) or self._by_key.get(name.casefold())
+        if record is None:
+            return default
+        if category is not None and category not in record.categories:
+            for other in self.category(category):
+                if other.name == name:
+                    return other
+            return default
+        return record
+
+    def __getitem__(self, name):
+        record = self.get(name)
+        if record is None:
+            raise KeyError(name)
+        return record
+
+    def value(self, name):
+        return self.values[self[name].id]
+
+    def get_many(self, names, category=None):
+        # Resolve names in bulk; unknown names come back as None in their slot
+        by_name = self._by_name
+        by_key = self._by_key
+        records = []
+        for name in names:
+            record = by_name.get(name) or by_key.get(name.casefold())
+            if record is not None and category is not None and category not in record.categories:
+                record = self.get(name, category)
+            records.append(record)
+        return records
+
+    def to_mapping(self):
+        # Rebuild the CONSTANTS-style nested dict
+        return {
+            category: {record.name: record.as_dict() for record in self.category(category)}
+            for category in self._categories
+        }
+
+
+_default_store = None
+
+
+def default_store():
+    # The store for constants.CONSTANTS, parsed once per process
+    global _default_store
+    if _default_store is None:
+        from constants import CONSTANTS
+        _default_store = ConstantStore.from_mapping(CONSTANTS)
+    return _default_store
+
+
+def set_default_store(store):
+    # Install a store built elsewhere, e.g. loaded from a startup snapshot
+    global _default_store
+    _default_store = store
+
+
+def get_many(names, category=None):
+    return default_store().get_many(names, category)
@@ -0,0 +1,175 @@
+from array import array
+from bisect import bisect_right
+
+from registry import Constant
+
+RELEASES = ('2014', '2018', '2022')
+LATEST = RELEASES[-1]
+
+# CODATA values as delta chains: each entry is (first release, value) and a
+# value holds until the constant's next entry, so a release only stores the
+# constants it changed. Constants not listed here are unversioned and read
+# the same in every release.
+REVISIONS = {
+    'Speed of Light': (
+        ('2014', '299,792,458 m/s'),
+    ),
+    'Gravitational Constant': (
+        ('2014', '6.67408(31) × 10^-11 m^3 kg^-1 s^-2'),
+        ('2018', '6.67430(15) × 10^-11 m^3 kg^-1 s^-2'),
+    ),
+    'Planck\'s Constant': (
+        ('2014', '6.626070040(81) × 10^-34 J s'),
+        ('2018', '6.62607015 × 10^-34 J s'),
+    ),
+    'Boltzmann Constant': (
+        ('2014', '1.38064852(79) × 10^-23 J/K'),
+        ('2018', '1.380649 × 10^-23 J/K'),
+    ),
+    'Elementary Charge': (
+        ('2014', '1.6021766208(98) × 10^-19 C'),
+        ('2018', '1.602176634 × 10^-19 C'),
+    ),
+    'Magnetic Constant': (
+        ('2014', '4π × 10^-7 N/A^2'),
+        ('2018', '1.25663706212(19) × 10^-6 N/A^2'),
+        ('2022', '1.25663706127(20) × 10^-6 N/A^2'),
+    ),
+    'Fine-Structure Constant': (
+        ('2014', '0.0072973525664(17)'),
+        ('2018', '0.0072973525693(11)'),
+        ('2022', '0.0072973525643(11)'),
+    ),
+    'Stefan-Boltzmann Constant': (
+        ('2014', '5.670367(13) × 10^-8 W m^-2 K^-4'),
+        ('2018', '5.670374419 × 10^-8 W m^-2 K^-4'),
+    ),
+    'Gas Constant': (
+        ('2014', '8.3144598(48) J mol^-1 K^-1'),
+        ('2018', '8.314462618 J mol^-1 K^-1'),
+    ),
+    'Avogadro\'s Number': (
+        ('2014', '6.022140857(74) × 10^23 mol^-1'),
+        ('2018', '6.02214076 × 10^23 mol^-1'),
+    ),
+    'Faraday Constant': (
+        ('2014', '96485.33289(59) C/mol'),
+        ('2018', '96485.33212 C/mol'),
+    ),
+}
+
+
+class ReleaseError(ValueError):
+    pass
+
+
+class ReleaseStore:
+    # Point-in-time view over a ConstantStore. Each versioned constant keeps
+    # the release indices where its value changed next to one record per
+    # distinct value, so "X as of R" is a bisect over that chain and records
+    # are shared between all releases that agree on a value.
+    def __init__(self, store, revisions=REVISIONS, releases=RELEASES):
+        self.store = store
+        self.releases = tuple(releases)
+        self._positions = {release: i for i, release in enumerate(self.releases)}
+        self._chains = {}
+        for name, changes in revisions.items():
+            base = store.get(name)
+            if base is None:
+                continue
+            indices = array('B', (self.release_index(release) for release, _ in changes))
+            records = tuple(self._record(base, text) for _, text in changes)
+            self._chains[base.id] = (indices, records)
+
+    @staticmethod
+    def _record(base, text):
+        # Release records keep the base id, so models can map them to rows
+        if text == base.text:
+            return base
+        return Constant(base.id, base.name, text, base.description, base.categories)
+
+    def release_index(self, release):
+        try:
+            return self._positions[str(release)]
+        except KeyError:
+            raise ReleaseError(f"Unknown release '{release}'; expected one of {', '.join(self.releases)}") from None
+
+    def versioned(self):
+        records = self.store.records
+        return [records[i] for i in self._chains]
+
+    def record_at(self, record, release):
+        # `record` as of `release`, or None if it was not yet defined then
+        chain = self._chains.get(record.id)
+        if chain is None:
+            return record
+        indices, records = chain
+        i = bisect_right(indices, self.release_index(release)) - 1
+        return records[i] if i >= 0 else None
+
+    def at(self, name, release, default=None):
+        record = self.store.get(name)
+        if record is None:
+            return default
+        record = self.record_at(record, release)
+        return default if record is None else record
+
+    def history(self, name):
+        # [(release, record)] for every release where the value changed
+        record = self.store.get(name)
+        chain = None if record is None else self._chains.get(record.id)
+        if chain is None:
+            return [] if record is None else [(self.releases[0], record)]
+        indices, records = chain
+        return [(self.releases[i], r) for i, r in zip(indices, records)]
+
+    def diff(self, old_release, new_release):
+        # {name: (old record, new record)} for constants whose value differs.
+        # Only versioned constants can differ, so unversioned ones are never read.
+        a = self.release_index(old_release)
+        b = self.release_index(new_release)
+        changes = {}
+        for indices, records in self._chains.values():
+            i = bisect_right(indices, a) - 1
+            j = bisect_right(indices, b) - 1
+            if i != j:
+                changes[records[0].name] = (records[i] if i >= 0 else None, records[j] if j >= 0 else None)
+        return changes
+
+    def view(self, release):
+        return ReleaseView(self, release)
+
+
+class ReleaseView:
+    # Read-only, store-like access to one release, for code written against
+    # ConstantStore (e.g. the CLI). Nothing is copied per release.
+    def __init__(self, releases, release):
+        releases.release_index(release)
+        self.releases = releases
+        self.release = str(release)
+        self.store = releases.store
+
+    def _at(self, record):
+        return None if record is None else self.releases.record_at(record, self.release)
+
+    def __iter__(self):
+        for record in self.store:
+            record = self._at(record)
+            if record is not None:
+                yield record
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def categories(self):
+        return self.store.categories()
+
+    def category(self, category):
+        return [record for record in map(self._at, self.store.category(category)) if record is not None]
+
+    def get(self, name, category=None, default=None):
+        record = self._at(self.store.get(name, category))
+        return default if record is None else record
+
+    def get_many(self, names, category=None):
+        return [self._at(record) for record in self.store.get_many(names, category)]
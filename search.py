@@ -0,0 +1,236 @@
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict
+
+GRAM = 3
+FUZZY_GRAM = 2
+FUZZY_THRESHOLD = 0.6
+SHORT_QUERY_CACHE = 256
+
+
+def normalize(text):
+    # Case- and accent-insensitive search key: 'Énergie' and 'energie' match.
+    # Symbols such as 'π' and '√' are kept, only combining marks are dropped.
+    if text.isascii():
+        return text.lower()
+    return ''.join(c for c in unicodedata.normalize('NFKD', text.casefold()) if not unicodedata.combining(c))
+
+
+def grams(text, n=GRAM):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class SearchIndex:
+    # Trigram index over constant names, descriptions and units, plus a bigram
+    # index over names for fuzzy matching. Searchable text is normalized once
+    # up front, queries intersect posting lists instead of scanning, and a
+    # query that extends the previous one only re-checks the previous hits.
+    # lookup() only reads, so it can run on a worker thread; its state is
+    # applied with remember() on the thread that changes the index.
+    def __init__(self, store):
+        self.store = store
+        self._names = []
+        self._haystacks = []
+        self._postings = {}
+        self._name_postings = {}
+        self._name_gram_counts = []
+        self._short = OrderedDict()
+        self._last = None
+        # Bumped by every change, so remember() can drop stale state
+        self._generation = 0
+        self._removed = set()
+        # Record id -> (name, description) in the active language
+        self._localized = {}
+        for record in store.records:
+            self.add(record)
+            if not record.categories:
+                self.remove(record.id)
+
+    def __len__(self):
+        # Number of ids indexed, including removed ones
+        return len(self._names)
+
+    def _texts(self, record):
+        # Translated text is indexed next to the original, so a record is
+        # found by either
+        name = normalize(record.name)
+        texts = [name, normalize(record.description or ''), normalize(record.unit_text)]
+        localized = self._localized.get(record.id)
+        if localized is not None:
+            translated = normalize(localized[0])
+            name = f'{name}\n{translated}'
+            texts.extend((translated, normalize(localized[1])))
+        return name, '\n'.join(texts)
+
+    def add(self, record):
+        # New records must be added in id order so posting lists stay sorted
+        name, haystack = self._texts(record)
+        self._names.append(name)
+        self._haystacks.append(haystack)
+        for gram in grams(haystack):
+            self._postings.setdefault(gram, []).append(record.id)
+        name_grams = grams(name, FUZZY_GRAM)
+        for gram in name_grams:
+            self._name_postings.setdefault(gram, []).append(record.id)
+        self._name_gram_counts.append(len(name_grams))
+        self._changed()
+
+    def update(self, record):
+        # Re-index a record rewritten under an existing id; only the grams
+        # that differ between the old and new text touch posting lists
+        self._reindex(record)
+        self._removed.discard(record.id)
+        self._changed()
+
+    def _reindex(self, record):
+        i = record.id
+        name, haystack = self._texts(record)
+        self._repost(self._postings, grams(self._haystacks[i]), grams(haystack), i)
+        self._repost(self._name_postings, grams(self._names[i], FUZZY_GRAM), grams(name, FUZZY_GRAM), i)
+        self._names[i] = name
+        self._haystacks[i] = haystack
+        self._name_gram_counts[i] = len(grams(name, FUZZY_GRAM))
+
+    def localize(self, texts):
+        # Switch the indexed translations to `texts` ({id: (name, description)},
+        # see i18n.localized_texts). Only records whose translation is added,
+        # dropped or changed are re-posted; the rest of the index is untouched.
+        previous = self._localized
+        self._localized = dict(texts)
+        records = self.store.records
+        for i in previous.keys() | texts.keys():
+            if i not in self._removed and previous.get(i) != texts.get(i):
+                self._reindex(records[i])
+        self._changed()
+
+    def remove(self, record_id):
+        # Drop a retired record from every posting list
+        i = record_id
+        self._repost(self._postings, grams(self._haystacks[i]), set(), i)
+        self._repost(self._name_postings, grams(self._names[i], FUZZY_GRAM), set(), i)
+        self._names[i] = self._haystacks[i] = ''
+        self._name_gram_counts[i] = 0
+        self._removed.add(i)
+        self._changed()
+
+    @staticmethod
+    def _repost(postings, old, new, i):
+        for gram in old - new:
+            posting = postings[gram]
+            del posting[bisect_left(posting, i)]
+            if not posting:
+                del postings[gram]
+        for gram in new - old:
+            insort(postings.setdefault(gram, []), i)
+
+    def _changed(self):
+        self._short.clear()
+        self._last = None
+        self._generation += 1
+
+    def _scope(self, category):
+        if category is None:
+            if self._removed:
+                removed = self._removed
+                return [i for i in range(len(self._haystacks)) if i not in removed]
+            return range(len(self._haystacks))
+        return self.store.category_ids(category)
+
+    def _candidates(self, query, category):
+        # Ids whose text may contain `query`, in store order
+        if len(query) < GRAM:
+            cached = self._short.get((query, category))
+            if cached is None:
+                haystacks = self._haystacks
+                cached = [i for i in self._scope(category) if query in haystacks[i]]
+            return cached
+
+        # Only the shortest posting list is walked: the substring check below
+        # costs less than building sets to intersect it with the others
+        candidates = None
+        for gram in grams(query):
+            posting = self._postings.get(gram)
+            if posting is None:
+                return []
+            if candidates is None or len(posting) < len(candidates):
+                candidates = posting
+        if category is not None:
+            # With few candidates, checking each one's categories beats
+            # building a set of the whole category
+            ids = self.store.category_ids(category)
+            if len(candidates) * 4 < len(ids):
+                records = self.store.records
+                candidates = [i for i in candidates if category in records[i].categories]
+            else:
+                allowed = set(ids)
+                candidates = [i for i in candidates if i in allowed]
+        haystacks = self._haystacks
+        return [i for i in candidates if query in haystacks[i]]
+
+    def search(self, query, category=None, fuzzy=True):
+        # Return matching record ids, name matches first. `category=None`
+        # searches across every category.
+        ids, state = self.lookup(query, category, fuzzy)
+        self.remember(state)
+        return ids
+
+    def lookup(self, query, category=None, fuzzy=True):
+        # search() without side effects: returns (ids, state), where state
+        # lets the next query narrow these hits once passed to remember()
+        generation = self._generation
+        query = normalize(query.strip())
+        if not query:
+            return list(self._scope(category)), (generation, query, category, None)
+
+        last = self._last
+        if last is not None and last[1] == category and last[0] in query and last[2]:
+            haystacks = self._haystacks
+            hits = [i for i in last[2] if query in haystacks[i]]
+        else:
+            hits = self._candidates(query, category)
+        state = (generation, query, category, hits)
+
+        if not hits:
+            return (self.fuzzy(query, category) if fuzzy else []), state
+        names = self._names
+        in_name = [i for i in hits if query in names[i]]
+        if len(in_name) == len(hits):
+            return hits, state
+        return in_name + [i for i in hits if query not in names[i]], state
+
+    def remember(self, state):
+        # Keep a lookup's hits for the next keystroke, unless the index has
+        # changed since the lookup started
+        generation, query, category, hits = state
+        if generation != self._generation:
+            return
+        self._last = (query, category, hits) if query else None
+        if query and len(query) < GRAM:
+            key = (query, category)
+            self._short[key] = hits
+            self._short.move_to_end(key)
+            if len(self._short) > SHORT_QUERY_CACHE:
+                self._short.popitem(last=False)
+
+    def fuzzy(self, query, category=None, limit=50):
+        # Rank names by bigram overlap to tolerate typos: a name qualifies when
+        # it contains most of the query's bigrams, ties go to the closer length
+        query = normalize(query.strip())
+        query_grams = grams(query, FUZZY_GRAM)
+        if not query_grams:
+            return []
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._name_postings.get(gram, ()))
+        allowed = set(self.store.category_ids(category)) if category is not None else None
+        counts = self._name_gram_counts
+        scored = []
+        for i, common in shared.items():
+            if allowed is not None and i not in allowed:
+                continue
+            coverage = common / len(query_grams)
+            if coverage >= FUZZY_THRESHOLD:
+                dice = 2.0 * common / (len(query_grams) + counts[i])
+                scored.append((-coverage, -dice, i))
+        scored.sort()
+        return [i for _, _, i in scored[:limit]]
@@ -0,0 +1,427 @@
+import asyncio
+import hashlib
+import io
+import json
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from cli import DEFAULT_HOST, DEFAULT_PORT, FIELDS, RowWriter, record_row
+from units import UnitError, compile_conversion
+
+# Bytes of cached responses kept in memory
+CACHE_BYTES = 64 << 20
+MAX_BODY = 1 << 20
+# Idle keep-alive connections are closed after this many seconds
+KEEP_ALIVE_TIMEOUT = 15
+SEARCH_LIMIT = 100
+# Endpoints whose cost grows with the input or the catalog; they run on a
+# worker thread so one slow request cannot stall the other connections
+SLOW_ROUTES = frozenset({'/export', '/eval'})
+WORKERS = 4
+# Seconds a slow endpoint may take before the client gets a 504
+HANDLER_TIMEOUT = 10
+
+REASONS = {
+    200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 504: 'Gateway Timeout',
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Response:
+    # A rendered response; the ETag is computed once, when it is cached
+    __slots__ = ('status', 'body', 'content_type', 'etag')
+
+    def __init__(self, status, body, content_type='application/json; charset=utf-8'):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"' if status == 200 else None
+
+
+def json_response(payload, status=200):
+    return Response(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+
+class ConstantService:
+    # Answers queries against a ConstantStore. Every successful response is
+    # cached under its endpoint and parameters, so a repeated query costs a
+    # dict lookup; call invalidate() after changing the store. respond() may
+    # be called from worker threads.
+    #
+    # Cache keys hold only the parameters an endpoint reads, so unknown
+    # query parameters (e.g. cache busters) share one entry, and the cache
+    # is bounded by the bytes it holds rather than by its entry count.
+    def __init__(self, store, index=None, cache_bytes=CACHE_BYTES):
+        self.store = store
+        self._index = index
+        self._releases = None
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.generation = 0
+        # path: (handler, parameters it reads)
+        self.routes = {
+            '/lookup': (self.lookup, ('name', 'category', 'release')),
+            '/search': (self.search, ('q', 'category', 'limit', 'release')),
+            '/bulk': (self.bulk, ('name', 'names', 'category', 'release')),
+            '/convert': (self.convert, ('to', 'name', 'category', 'value', 'from', 'release')),
+            '/export': (self.export, ('format', 'category', 'release')),
+            '/eval': (self.evaluate, ('expr', 'mode', 'precision', 'release')),
+            '/categories': (self.categories, ()),
+            '/releases': (self.releases, ()),
+        }
+
+    @property
+    def index(self):
+        if self._index is None:
+            from search import SearchIndex
+            self._index = SearchIndex(self.store)
+        return self._index
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+            self._cached_bytes = 0
+            self.generation += 1
+
+    def is_slow(self, target):
+        return urlsplit(target).path.rstrip('/') in SLOW_ROUTES
+
+    def cached(self, method, target, body=b''):
+        # The cached response for a request, or None
+        try:
+            _, _, key = self._parse(method, target, body)
+        except (HTTPError, ValueError):
+            return None
+        return self._get(key)
+
+    def respond(self, method, target, body=b''):
+        try:
+            handler, params, key = self._parse(method, target, body)
+            response = self._get(key)
+            if response is not None:
+                return response
+            response = handler(params)
+        except HTTPError as e:
+            return json_response({'error': str(e)}, e.status)
+        except (ValueError, ArithmeticError) as e:
+            return json_response({'error': str(e)}, 400)
+        if response.status == 200:
+            self._put(key, response)
+        return response
+
+    def _get(self, key):
+        with self._lock:
+            response = self._cache.get(key)
+            if response is not None:
+                self._cache.move_to_end(key)
+            return response
+
+    def _put(self, key, response):
+        size = len(key) + len(response.body)
+        if size > self.cache_bytes // 4:
+            # One large export would evict everything else
+            return
+        with self._lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._cached_bytes -= len(key) + len(old.body)
+            self._cache[key] = response
+            self._cached_bytes += size
+            while self._cached_bytes > self.cache_bytes:
+                old_key, old = self._cache.popitem(last=False)
+                self._cached_bytes -= len(old_key) + len(old.body)
+
+    def _parse(self, method, target, body):
+        # (handler, params, cache key) for a request
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        params = parse_qs(url.query)
+        if path.startswith('/constants/'):
+            params['name'] = [unquote(path[len('/constants/'):])]
+            path = '/lookup'
+        route = self.routes.get(path)
+        if route is None:
+            raise HTTPError(404, f"No endpoint '{path}'")
+        handler, names = route
+        if method == 'POST':
+            if path != '/bulk':
+                raise HTTPError(405, f"'{path}' only supports GET")
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                raise HTTPError(400, 'Request body must be JSON') from None
+            if not isinstance(payload, dict):
+                raise HTTPError(400, 'Request body must be a JSON object')
+            params.update({key: value if isinstance(value, list) else [value]
+                           for key, value in payload.items()})
+        elif method not in ('GET', 'HEAD'):
+            raise HTTPError(405, f"Method '{method}' is not allowed")
+        key = json.dumps([path, {name: params[name] for name in names if name in params}],
+                         ensure_ascii=False, sort_keys=True)
+        return handler, params, key
+
+    def _one(self, params, name, default=None, required=False):
+        values = params.get(name)
+        if not values:
+            if required:
+                raise HTTPError(400, f"Missing parameter '{name}'")
+            return default
+        return values[0]
+
+    def _view(self, params):
+        # The store as of ?release=, or the built-in catalog
+        release = self._one(params, 'release')
+        if release is None:
+            return self.store
+        if self._releases is None:
+            from releases import ReleaseStore
+            self._releases = ReleaseStore(self.store)
+        return self._releases.view(release)
+
+    def lookup(self, params):
+        name = self._one(params, 'name', required=True)
+        record = self._view(params).get(name, self._one(params, 'category'))
+        if record is None:
+            raise HTTPError(404, f"Unknown constant '{name}'")
+        row = record_row(record)
+        row['description'] = record.description
+        return json_response(row)
+
+    def search(self, params):
+        query = self._one(params, 'q', '')
+        category = self._one(params, 'category')
+        limit = int(self._one(params, 'limit', SEARCH_LIMIT))
+        view = self._view(params)
+        records = self.store.records
+        ids = self.index.search(query, category)
+        rows = []
+        for i in ids[:limit]:
+            record = records[i] if view is self.store else view.get(records[i].name)
+            if record is not None:
+                rows.append(record_row(record))
+        return json_response({'query': query, 'total': len(ids), 'results': rows})
+
+    def bulk(self, params):
+        names = params.get('name') or params.get('names') or []
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise HTTPError(400, "'names' must be a list of strings")
+        category = self._one(params, 'category')
+        records = self._view(params).get_many(names, category)
+        return json_response([record_row(record) if record is not None else {'name': name, 'error': 'not found'}
+                              for name, record in zip(names, records)])
+
+    def convert(self, params):
+        target = self._one(params, 'to', required=True)
+        name = self._one(params, 'name')
+        if name is not None:
+            record = self._view(params).get(name, self._one(params, 'category'))
+            if record is None:
+                raise HTTPError(404, f"Unknown constant '{name}'")
+            if record.unit is None:
+                raise HTTPError(400, f"'{record.name}' has no numeric value")
+            value, uncertainty, source = record.value, record.uncertainty, record.unit_text
+        else:
+            value = float(self._one(params, 'value', required=True))
+            uncertainty = 0.0
+            source = self._one(params, 'from', required=True)
+        try:
+            conversion = compile_conversion(source, target)
+        except UnitError as e:
+            raise HTTPError(400, str(e)) from None
+        return json_response({
+            'name': name, 'value': conversion(value),
+            'uncertainty': None if math.isnan(uncertainty) else uncertainty * conversion.factor,
+            'unit': target, 'from': source,
+        })
+
+    def export(self, params):
+        fmt = self._one(params, 'format', 'jsonl')
+        if fmt not in ('jsonl', 'csv'):
+            raise HTTPError(400, "'format' must be 'jsonl' or 'csv'")
+        category = self._one(params, 'category')
+        view = self._view(params)
+        records = view.category(category) if category else view
+        out = io.StringIO()
+        writer = RowWriter(out, fmt, FIELDS + ('description',))
+        for record in records:
+            row = record_row(record)
+            row['description'] = record.description
+            writer.write(row)
+        content_type = 'text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson; charset=utf-8'
+        return Response(200, out.getvalue().encode('utf-8'), content_type)
+
+    def evaluate(self, params):
+        from expr import DEFAULT_PRECISION, ExpressionError, check_precision, compile_expression
+
+        expression = self._one(params, 'expr', required=True)
+        mode = self._one(params, 'mode', 'float')
+        try:
+            precision = check_precision(int(self._one(params, 'precision', DEFAULT_PRECISION)))
+            plan = compile_expression(expression)
+            view = self._view(params)
+            result = plan.evaluate(view, mode, precision)
+        except ExpressionError as e:
+            raise HTTPError(400, str(e)) from None
+        try:
+            unit = plan.unit(view).symbol
+        except (ExpressionError, ArithmeticError):
+            # e.g. the fractional dimensions of sqrt(G); the value still stands
+            unit = None
+        row = {'expression': expression, 'unit': unit}
+        if mode == 'uncertainty':
+            row['value'], row['uncertainty'] = result.value, result.uncertainty
+        else:
+            row['value'] = result if isinstance(result, float) else str(result)
+        return json_response(row)
+
+    def categories(self, params):
+        return json_response({category: len(self.store.category_ids(category))
+                              for category in self.store.categories()})
+
+    def releases(self, params):
+        from releases import RELEASES
+        return json_response(list(RELEASES))
+
+
+class ConstantServer:
+    # HTTP/1.1 front end for a ConstantService on asyncio streams, with
+    # keep-alive and ETag revalidation (If-None-Match answers 304)
+    def __init__(self, service, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=HANDLER_TIMEOUT):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.server = None
+        self.executor = ThreadPoolExecutor(WORKERS, thread_name_prefix='constants-server')
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.LimitOverrunError,
+                        ConnectionError):
+                    break
+                keep_alive = await self._handle_request(head, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, head, reader, writer):
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ', 2)
+        except ValueError:
+            self._write(writer, json_response({'error': 'Malformed request line'}, 400), 'HTTP/1.1', False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._write(writer, json_response({'error': 'Invalid Content-Length'}, 400), version, False)
+            return False
+        if length > MAX_BODY:
+            self._write(writer, json_response({'error': 'Request body too large'}, 413), version, False)
+            return False
+        body = await reader.readexactly(length) if length else b''
+
+        try:
+            response = await self._respond(method, target, body)
+        except Exception as e:
+            response = json_response({'error': f'{type(e).__name__}: {e}'}, 500)
+        not_modified = response.etag is not None and _matches(headers.get('if-none-match'), response.etag)
+        self._write(writer, response, version, keep_alive,
+                    status=304 if not_modified else response.status,
+                    send_body=method != 'HEAD' and not not_modified)
+        return keep_alive
+
+    async def _respond(self, method, target, body):
+        # Cached responses and cheap endpoints are answered inline; slow ones
+        # on the executor, giving up (but not blocking the loop) after timeout
+        service = self.service
+        response = service.cached(method, target, body)
+        if response is not None or not service.is_slow(target):
+            return response or service.respond(method, target, body)
+        future = asyncio.get_running_loop().run_in_executor(self.executor, service.respond, method, target, body)
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            return json_response({'error': f'Request took longer than {self.timeout} s'}, 504)
+
+    def _write(self, writer, response, version, keep_alive, status=None, send_body=True):
+        status = status or response.status
+        lines = [
+            f'{version if version.startswith("HTTP/1.") else "HTTP/1.1"} {status} {REASONS[status]}',
+            f'Content-Type: {response.content_type}',
+            f'Content-Length: {len(response.body) if status != 304 else 0}',
+            f'Connection: {"keep-alive" if keep_alive else "close"}',
+        ]
+        if response.etag is not None:
+            lines.append(f'ETag: {response.etag}')
+            lines.append('Cache-Control: no-cache')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if send_body:
+            writer.write(response.body)
+
+
+def _matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == '*' or etag in (tag.strip() for tag in if_none_match.split(','))
+
+
+def serve(store=None, index=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    # Run until interrupted
+    if store is None:
+        import snapshot
+        store, index = snapshot.load()
+    server = ConstantServer(ConstantService(store, index), host, port)
+
+    async def run():
+        await server.start()
+        print(f'Serving constants on http://{server.host}:{server.port}', flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.executor.shutdown(wait=False)
+    return 0
@@ -0,0 +1,223 @@
+import mmap
+import os
+import struct
+from multiprocessing.shared_memory import SharedMemory
+
+from catalog import Catalog, CatalogError, build_catalog
+
+DEFAULT_NAME = 'scientific-constants'
+# Control segment: magic, current generation, size of that generation's data segment
+CONTROL = struct.Struct('<8sQQ')
+CONTROL_MAGIC = b'SCSHM\x00\x01\x00'
+# Data segment header: generation, entry count, catalog size, column offset.
+# The catalog (see catalog.py) follows the header; the float64 value and
+# uncertainty columns follow the catalog, 8-byte aligned, in entry order.
+DATA = struct.Struct('<QQQQ')
+ATTACH_RETRIES = 5
+
+
+def _segment(name, generation):
+    return f'{name}-{generation}'
+
+
+class _Segment:
+    # A shared memory segment mapped read-only
+    __slots__ = ('_mmap', 'buf')
+
+    def __init__(self, mapping):
+        self._mmap = mapping
+        self.buf = memoryview(mapping)
+
+    def close(self):
+        self.buf.release()
+        self._mmap.close()
+
+
+def _attach(name):
+    # POSIX segments are opened directly, read-only, so readers never
+    # register them with the resource tracker (which would unlink them when
+    # a worker exits); Windows has no tracker.
+    try:
+        import _posixshmem
+    except ImportError:
+        return SharedMemory(name=name)
+    fd = _posixshmem.shm_open(f'/{name}', os.O_RDONLY, mode=0o600)
+    try:
+        mapping = mmap.mmap(fd, os.fstat(fd).st_size, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd)
+    return _Segment(mapping)
+
+
+class CatalogPublisher:
+    # Publishes a parsed catalog into shared memory for worker processes.
+    # Each publish writes a new data segment and then bumps the generation in
+    # a small control segment, so readers never see a half-written catalog;
+    # the previous data segment is unlinked and disappears once its last
+    # reader lets go of it.
+    def __init__(self, name=DEFAULT_NAME):
+        self.name = name
+        self.generation = 0
+        self._data = None
+        try:
+            self._control = SharedMemory(name=name, create=True, size=CONTROL.size)
+        except FileExistsError:
+            # Left over from an earlier publisher; carry on from its generation
+            self._control = SharedMemory(name=name)
+            magic, self.generation, _ = CONTROL.unpack_from(self._control.buf, 0)
+            if magic != CONTROL_MAGIC:
+                self.generation = 0
+
+    def publish(self, source=None):
+        # `source` is a CONSTANTS-style mapping or a ConstantStore; defaults to CONSTANTS
+        if source is None:
+            from constants import CONSTANTS
+            source = CONSTANTS
+        mapping = source.to_mapping() if hasattr(source, 'to_mapping') else source
+        chunks, values, uncertainties = build_catalog(mapping, columns=True)
+        count = len(values)
+        catalog_size = sum(len(chunk) for chunk in chunks)
+        column_offset = DATA.size + (catalog_size + 7) // 8 * 8
+
+        generation = self.generation + 1
+        name = _segment(self.name, generation)
+        try:
+            SharedMemory(name=name).unlink()
+        except FileNotFoundError:
+            pass
+        # Chunks are copied straight into the segment; the catalog is never
+        # assembled in private memory first
+        data = SharedMemory(name=name, create=True, size=column_offset + 16 * count)
+        buffer = data.buf
+        position = DATA.size
+        for chunk in chunks:
+            buffer[position:position + len(chunk)] = chunk
+            position += len(chunk)
+        buffer[column_offset:column_offset + 8 * count] = memoryview(values).cast('B')
+        buffer[column_offset + 8 * count:column_offset + 16 * count] = memoryview(uncertainties).cast('B')
+        DATA.pack_into(buffer, 0, generation, count, catalog_size, column_offset)
+
+        # Readers switch over when they see the new generation
+        CONTROL.pack_into(self._control.buf, 0, CONTROL_MAGIC, generation, data.size)
+        if self._data is not None:
+            self._data.close()
+            self._data.unlink()
+        self._data = data
+        self.generation = generation
+        return generation
+
+    def close(self):
+        # Unlink everything; attached readers keep their current mapping
+        for segment in (self._data, self._control):
+            if segment is not None:
+                segment.close()
+                segment.unlink()
+        self._data = self._control = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SharedCatalog:
+    # Read-only view of a published catalog: the Catalog API over shared
+    # memory plus `values` and `uncertainties` as float64 memoryviews (wrap
+    # them with numpy.frombuffer for vector work). refresh() is one small
+    # read of the control segment and re-attaches only when the generation moved.
+    def __init__(self, name=DEFAULT_NAME):
+        self.name = name
+        self.generation = 0
+        self.catalog = None
+        self.values = None
+        self.uncertainties = None
+        self._data = None
+        self._view = None
+        self._control = _attach(name)
+        if not self.refresh():
+            self.close()
+            raise CatalogError(f"No catalog has been published under '{name}'")
+
+    def published_generation(self):
+        magic, generation, _ = CONTROL.unpack_from(self._control.buf, 0)
+        return generation if magic == CONTROL_MAGIC else 0
+
+    def refresh(self):
+        # Returns True when a (new) generation is attached
+        for _ in range(ATTACH_RETRIES):
+            generation = self.published_generation()
+            if not generation:
+                return False
+            if generation == self.generation:
+                return False
+            try:
+                data = _attach(_segment(self.name, generation))
+            except FileNotFoundError:
+                # Replaced between reading the control segment and attaching
+                continue
+            view = data.buf.toreadonly()
+            found, count, catalog_size, column_offset = DATA.unpack_from(view, 0)
+            if found != generation:
+                view.release()
+                data.close()
+                continue
+            self._release()
+            self._data, self._view = data, view
+            self.catalog = Catalog(_segment(self.name, generation), view[DATA.size:DATA.size + catalog_size])
+            self.values = view[column_offset:column_offset + 8 * count].cast('d')
+            self.uncertainties = view[column_offset + 8 * count:column_offset + 16 * count].cast('d')
+            self.generation = generation
+            return True
+        return False
+
+    def _release(self):
+        # Every exported view must be released before the segment can close
+        if self.catalog is not None:
+            self.catalog.close()
+            self.values.release()
+            self.uncertainties.release()
+            self._view.release()
+            self._data.close()
+        self.catalog = self.values = self.uncertainties = self._view = self._data = None
+
+    def close(self):
+        self._release()
+        if self._control is not None:
+            self._control.close()
+            self._control = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.catalog)
+
+    def __iter__(self):
+        return iter(self.catalog)
+
+    def categories(self):
+        return self.catalog.categories()
+
+    def category(self, category):
+        return self.catalog.category(category)
+
+    def get(self, name, category=None, default=None):
+        return self.catalog.get(name, category, default)
+
+
+_attached = {}
+
+
+def attach(name=DEFAULT_NAME):
+    # Per-process shared view for pool workers, refreshed on every call so
+    # a republished catalog is picked up at the next task
+    catalog = _attached.get(name)
+    if catalog is None:
+        catalog = _attached[name] = SharedCatalog(name)
+    else:
+        catalog.refresh()
+    return catalog
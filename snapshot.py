@@ -0,0 +1,71 @@
+import os
+import pickle
+import sys
+
+from files import atomic_write, prune
+
+SNAPSHOT_VERSION = 4
+# The catalog data plus every module whose classes end up in the pickle, so
+# a change to their attributes cannot load a snapshot built by older code
+SOURCES = tuple(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ('constants.py', 'registry.py', 'search.py', 'units.py')
+)
+
+
+def cache_dir():
+    override = os.environ.get('SCIENTIFIC_CONSTANTS_CACHE')
+    if override:
+        return override
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'scientific-constants')
+
+
+def _fingerprint(sources):
+    # Snapshots are keyed on the source files' size and mtime, so editing
+    # any of them invalidates the snapshot without hashing their contents
+    parts = [f'v{SNAPSHOT_VERSION}', f'py{sys.version_info[0]}{sys.version_info[1]}']
+    for path in sources:
+        stat = os.stat(path)
+        parts.append(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+    return '_'.join(parts)
+
+
+def _build():
+    from registry import default_store
+    from search import SearchIndex
+
+    store = default_store()
+    return store, SearchIndex(store)
+
+
+def load(sources=SOURCES, use_cache=True):
+    # Return (store, search_index) for the built-in catalog, from a pickled
+    # snapshot when one matches the sources, otherwise parsed and then cached
+    if not use_cache:
+        return _build()
+    try:
+        path = os.path.join(cache_dir(), f'catalog-{_fingerprint(sources)}.pickle')
+    except OSError:
+        return _build()
+
+    try:
+        with open(path, 'rb') as file:
+            store, index = pickle.load(file)
+        from registry import set_default_store
+        set_default_store(store)
+        return store, index
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        pass
+
+    store, index = _build()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path) as file:
+            pickle.dump((store, index), file, protocol=pickle.HIGHEST_PROTOCOL)
+        # Drop snapshots of older versions of the sources
+        prune(os.path.dirname(path), 'catalog-', '.pickle', os.path.basename(path))
+    except OSError:
+        # A read-only or full cache directory only costs the next start a rebuild
+        pass
+    return store, index
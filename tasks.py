@@ -0,0 +1,142 @@
+import time
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+import perf
+
+
+class CancelToken:
+    # Shared flag between the GUI and a running task. Calling the token
+    # returns True once cancelled, so it can be passed wherever a
+    # `cancelled()` callable is expected.
+    __slots__ = ('_cancelled',)
+
+    def __init__(self):
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def __call__(self):
+        return self._cancelled
+
+
+class _TaskSignals(QObject):
+    # Created on the GUI thread, so emits from workers arrive as queued calls there
+    progress = pyqtSignal(int)
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    done = pyqtSignal()
+
+
+class _Task(QRunnable):
+    def __init__(self, function, token, signals, name):
+        super().__init__()
+        self.setAutoDelete(True)
+        self.function = function
+        self.token = token
+        self.signals = signals
+        self.name = name
+
+    def run(self):
+        recorder = perf.recorder
+        start = time.perf_counter_ns() if recorder is not None else 0
+        try:
+            if not self.token.cancelled:
+                result = self.function(self.signals.progress.emit, self.token)
+                if not self.token.cancelled:
+                    self.signals.result.emit(result)
+        except Exception as e:
+            # Errors raised because the task was cancelled are not reported
+            if not self.token.cancelled:
+                self.signals.error.emit(str(e) or type(e).__name__)
+        finally:
+            if recorder is not None:
+                recorder.add(self.name, start, time.perf_counter_ns())
+            self.signals.done.emit()
+
+
+def _unless_cancelled(token, handler):
+    def deliver(value):
+        if not token.cancelled:
+            handler(value)
+    return deliver
+
+
+class TaskScheduler(QObject):
+    # Runs `function(progress, cancelled)` callables on a thread pool and
+    # delivers results back on the GUI thread.
+    #
+    # Tasks submitted with a `key` are coalesced: at most one task per key
+    # runs at a time, a newer submission cancels the running one, and only the
+    # newest waiting submission is started next. Superseded results are never
+    # delivered, so e.g. a stale search cannot overwrite a fresher one.
+    def __init__(self, parent=None, max_threads=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self._running = {}
+        self._pending = {}
+        self._active = {}
+
+    def submit(self, function, on_result=None, on_error=None, on_progress=None, key=None):
+        token = CancelToken()
+        request = (function, token, on_result, on_error, on_progress, key)
+        if key is not None and key in self._running:
+            self._running[key].cancel()
+            superseded = self._pending.get(key)
+            if superseded is not None:
+                superseded[1].cancel()
+            self._pending[key] = request
+        else:
+            self._start(request)
+        return token
+
+    def _start(self, request):
+        function, token, on_result, on_error, on_progress, key = request
+        signals = _TaskSignals()
+        # Re-check on the GUI thread: the task may be superseded while its
+        # result is still queued
+        for signal, handler in ((signals.result, on_result), (signals.error, on_error),
+                                (signals.progress, on_progress)):
+            if handler is not None:
+                signal.connect(_unless_cancelled(token, handler))
+        signals.done.connect(lambda: self._finished(signals, key, token))
+        self._active[signals] = token
+        if key is not None:
+            self._running[key] = token
+        name = f"task:{key or getattr(function, '__qualname__', 'task')}"
+        self.pool.start(_Task(function, token, signals, name))
+
+    def _finished(self, signals, key, token):
+        self._active.pop(signals, None)
+        if key is None or self._running.get(key) is not token:
+            return
+        del self._running[key]
+        request = self._pending.pop(key, None)
+        if request is not None and not request[1].cancelled:
+            self._start(request)
+
+    def cancel(self, key):
+        # The running task keeps its slot until it returns, so nothing else
+        # with this key starts alongside it
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            pending[1].cancel()
+        running = self._running.get(key)
+        if running is not None:
+            running.cancel()
+
+    def shutdown(self, timeout_ms=2000):
+        for request in self._pending.values():
+            request[1].cancel()
+        self._pending.clear()
+        for token in self._active.values():
+            token.cancel()
+        self.pool.clear()
+        return self.pool.waitForDone(timeout_ms)
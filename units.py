@@ -0,0 +1,322 @@
+import re
+from functools import lru_cache
+
+# SI base dimensions, in the order used by every dimension vector
+BASE_DIMENSIONS = ('m', 'kg', 's', 'A', 'K', 'mol', 'cd')
+DIMENSIONLESS = (0, 0, 0, 0, 0, 0, 0)
+
+
+class UnitError(ValueError):
+    pass
+
+
+class Unit:
+    # A unit is a scale factor to SI plus an integer exponent per base dimension
+    __slots__ = ('scale', 'dims', 'symbol')
+
+    def __init__(self, scale, dims, symbol=''):
+        self.scale = scale
+        self.dims = dims
+        self.symbol = symbol
+
+    def __mul__(self, other):
+        dims = tuple(a + b for a, b in zip(self.dims, other.dims))
+        return Unit(self.scale * other.scale, dims, _join(self.symbol, other.symbol, ' '))
+
+    def __truediv__(self, other):
+        dims = tuple(a - b for a, b in zip(self.dims, other.dims))
+        return Unit(self.scale / other.scale, dims, _join(self.symbol, other.symbol, '/'))
+
+    def __pow__(self, power):
+        dims = tuple(d * power for d in self.dims)
+        symbol = f'{self.symbol}^{power}' if self.symbol and power != 1 else self.symbol
+        return Unit(self.scale ** power, dims, symbol)
+
+    def __eq__(self, other):
+        return isinstance(other, Unit) and self.scale == other.scale and self.dims == other.dims
+
+    def __hash__(self):
+        return hash((self.scale, self.dims))
+
+    def __repr__(self):
+        return f'Unit({self.symbol!r}, scale={self.scale!r}, dims={self.dims!r})'
+
+    @property
+    def dimensionless(self):
+        return self.dims == DIMENSIONLESS
+
+    def dimension_string(self):
+        # Render the dimension vector in SI base units, e.g. 'kg m^2 s^-2'
+        parts = []
+        for symbol, power in zip(BASE_DIMENSIONS, self.dims):
+            if power == 1:
+                parts.append(symbol)
+            elif power:
+                parts.append(f'{symbol}^{power}')
+        return ' '.join(parts)
+
+
+def _join(left, right, sep):
+    if not left:
+        return right if sep == ' ' else f'1/{right}'
+    if not right:
+        return left
+    return f'{left}{sep}{right}'
+
+
+def _dims(m=0, kg=0, s=0, A=0, K=0, mol=0, cd=0):
+    return (m, kg, s, A, K, mol, cd)
+
+
+# Unit symbols that may take an SI prefix
+PREFIXED_UNITS = {
+    'm': (1.0, _dims(m=1)),
+    'g': (1e-3, _dims(kg=1)),
+    's': (1.0, _dims(s=1)),
+    'A': (1.0, _dims(A=1)),
+    'K': (1.0, _dims(K=1)),
+    'mol': (1.0, _dims(mol=1)),
+    'cd': (1.0, _dims(cd=1)),
+    'Hz': (1.0, _dims(s=-1)),
+    'N': (1.0, _dims(m=1, kg=1, s=-2)),
+    'Pa': (1.0, _dims(m=-1, kg=1, s=-2)),
+    'J': (1.0, _dims(m=2, kg=1, s=-2)),
+    'W': (1.0, _dims(m=2, kg=1, s=-3)),
+    'C': (1.0, _dims(s=1, A=1)),
+    'V': (1.0, _dims(m=2, kg=1, s=-3, A=-1)),
+    'F': (1.0, _dims(m=-2, kg=-1, s=4, A=2)),
+    'Ω': (1.0, _dims(m=2, kg=1, s=-3, A=-2)),
+    'ohm': (1.0, _dims(m=2, kg=1, s=-3, A=-2)),
+    'S': (1.0, _dims(m=-2, kg=-1, s=3, A=2)),
+    'Wb': (1.0, _dims(m=2, kg=1, s=-2, A=-1)),
+    'T': (1.0, _dims(kg=1, s=-2, A=-1)),
+    'H': (1.0, _dims(m=2, kg=1, s=-2, A=-2)),
+    'L': (1e-3, _dims(m=3)),
+    'eV': (1.602176634e-19, _dims(m=2, kg=1, s=-2)),
+    'bar': (1e5, _dims(m=-1, kg=1, s=-2)),
+    'cal': (4.184, _dims(m=2, kg=1, s=-2)),
+    'rad': (1.0, DIMENSIONLESS),
+    'sr': (1.0, DIMENSIONLESS),
+}
+
+# Unit symbols that are never prefixed
+PLAIN_UNITS = {
+    'kg': (1.0, _dims(kg=1)),
+    'min': (60.0, _dims(s=1)),
+    'h': (3600.0, _dims(s=1)),
+    'day': (86400.0, _dims(s=1)),
+    'atm': (101325.0, _dims(m=-1, kg=1, s=-2)),
+    'Torr': (101325.0 / 760, _dims(m=-1, kg=1, s=-2)),
+    'Da': (1.66053906660e-27, _dims(kg=1)),
+    'u': (1.66053906660e-27, _dims(kg=1)),
+    'Å': (1e-10, _dims(m=1)),
+    'au': (149597870700.0, _dims(m=1)),
+    'ly': (9460730472580800.0, _dims(m=1)),
+    'pc': (3.0856775814913673e16, _dims(m=1)),
+    'kWh': (3.6e6, _dims(m=2, kg=1, s=-2)),
+    'lbf': (4.4482216152605, _dims(m=1, kg=1, s=-2)),
+    'lb': (0.45359237, _dims(kg=1)),
+    'in': (0.0254, _dims(m=1)),
+    'ft': (0.3048, _dims(m=1)),
+    'psi': (6894.757293168361, _dims(m=-1, kg=1, s=-2)),
+    '%': (0.01, DIMENSIONLESS),
+    # Temperature intervals; absolute readings go through AFFINE_UNITS
+    '°C': (1.0, _dims(K=1)),
+    'degC': (1.0, _dims(K=1)),
+    '°F': (5.0 / 9.0, _dims(K=1)),
+    'degF': (5.0 / 9.0, _dims(K=1)),
+}
+
+# Units with an offset from zero: kelvin = (reading + offset) * scale.
+# They only convert as absolute readings when they stand alone.
+AFFINE_UNITS = {
+    '°C': 273.15,
+    'degC': 273.15,
+    '°F': 459.67,
+    'degF': 459.67,
+}
+
+PREFIXES = {
+    'Y': 1e24, 'Z': 1e21, 'E': 1e18, 'P': 1e15, 'T': 1e12, 'G': 1e9,
+    'M': 1e6, 'k': 1e3, 'h': 1e2, 'da': 1e1, 'd': 1e-1, 'c': 1e-2,
+    'm': 1e-3, 'µ': 1e-6, 'μ': 1e-6, 'u': 1e-6, 'n': 1e-9, 'p': 1e-12,
+    'f': 1e-15, 'a': 1e-18, 'z': 1e-21, 'y': 1e-24,
+}
+
+_SUPERSCRIPTS = str.maketrans('⁰¹²³⁴⁵⁶⁷⁸⁹⁻⁺', '0123456789-+')
+# An exponent is its own token, so it can follow a symbol or a closing
+# parenthesis: 'm^2', 'm^(-2)', 'm²' and '(m/s)^2'
+_TOKEN_RE = re.compile(
+    r'\s*(?:(?P<open>\()|(?P<close>\))|(?P<div>/)'
+    r'|(?:\^|\*\*)(?:\((?P<pexp>[-+−]?\d+)\)|(?P<exp>[-+−]?\d+))|(?P<sup>[⁰¹²³⁴⁵⁶⁷⁸⁹⁻⁺]+)'
+    r'|(?P<mul>[*·⋅]|\s)|(?P<symbol>°?[A-Za-zµμΩÅ%]+))'
+)
+
+
+@lru_cache(maxsize=None)
+def lookup_symbol(symbol):
+    # Resolve a single unit symbol, trying exact names before prefix splits
+    if symbol in PLAIN_UNITS:
+        scale, dims = PLAIN_UNITS[symbol]
+        return Unit(scale, dims, symbol)
+    if symbol in PREFIXED_UNITS:
+        scale, dims = PREFIXED_UNITS[symbol]
+        return Unit(scale, dims, symbol)
+    for prefix, factor in PREFIXES.items():
+        base = symbol[len(prefix):]
+        if symbol.startswith(prefix) and base in PREFIXED_UNITS:
+            scale, dims = PREFIXED_UNITS[base]
+            return Unit(factor * scale, dims, symbol)
+    raise UnitError(f"Unknown unit '{symbol}'")
+
+
+def _tokenize(text):
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise UnitError(f"Cannot parse unit '{text}' at position {pos}")
+        pos = match.end()
+        if match.group('symbol'):
+            yield 'symbol', match.group('symbol')
+        elif match.group('open'):
+            yield 'open', None
+        elif match.group('close'):
+            yield 'close', None
+        elif match.group('div'):
+            yield 'div', None
+        elif match.group('mul') is None:
+            exp = match.group('pexp') or match.group('exp') or match.group('sup').translate(_SUPERSCRIPTS)
+            yield 'power', int(exp.replace('−', '-'))
+        # multiplication and whitespace are implicit between factors
+
+
+def _parse_group(tokens, text):
+    # A '/' divides by the next factor only, so 'J mol^-1 K^-1' and 'J/K' both
+    # read naturally. A factor is held back until the next token, which may
+    # be its exponent.
+    result = Unit(1.0, DIMENSIONLESS)
+    factor = None
+    divide = False
+    for kind, payload in tokens:
+        if kind == 'power':
+            if factor is None:
+                raise UnitError(f"Exponent without a unit in '{text}'")
+            factor = factor ** payload
+            continue
+        if factor is not None:
+            result = result / factor if divide else result * factor
+            factor = None
+            divide = False
+        if kind == 'close':
+            if divide:
+                raise UnitError(f"Dangling '/' in unit '{text}'")
+            return result, True
+        if kind == 'div':
+            divide = True
+        elif kind == 'open':
+            factor, closed = _parse_group(tokens, text)
+            if not closed:
+                raise UnitError(f"Unbalanced parentheses in unit '{text}'")
+        else:
+            factor = lookup_symbol(payload)
+    if factor is not None:
+        result = result / factor if divide else result * factor
+    elif divide:
+        raise UnitError(f"Dangling '/' in unit '{text}'")
+    return result, False
+
+
+@lru_cache(maxsize=4096)
+def parse_unit(text):
+    # Parse a unit string such as 'W m^-2 K^-4' into a Unit; '' is dimensionless
+    text = (text or '').strip()
+    if not text:
+        return Unit(1.0, DIMENSIONLESS, '')
+    unit, closed = _parse_group(iter(_tokenize(text)), text)
+    if closed:
+        raise UnitError(f"Unbalanced parentheses in unit '{text}'")
+    return Unit(unit.scale, unit.dims, text)
+
+
+class Conversion:
+    # A compiled conversion: target = value * factor + offset
+    __slots__ = ('factor', 'offset', 'source', 'target')
+
+    def __init__(self, factor, offset, source, target):
+        self.factor = factor
+        self.offset = offset
+        self.source = source
+        self.target = target
+
+    def __call__(self, value):
+        return value * self.factor + self.offset
+
+    def __repr__(self):
+        return f'Conversion({self.source!r} -> {self.target!r}, factor={self.factor!r}, offset={self.offset!r})'
+
+
+@lru_cache(maxsize=1024)
+def compile_conversion(source, target):
+    # Compiled once per (source, target) pair; later calls are a cache hit
+    source_unit = parse_unit(source)
+    target_unit = parse_unit(target)
+    if source_unit.dims != target_unit.dims:
+        raise UnitError(
+            f"Cannot convert '{source}' ({source_unit.dimension_string() or 'dimensionless'}) "
+            f"to '{target}' ({target_unit.dimension_string() or 'dimensionless'})"
+        )
+    factor = source_unit.scale / target_unit.scale
+    source_offset = AFFINE_UNITS.get(source_unit.symbol, 0.0)
+    target_offset = AFFINE_UNITS.get(target_unit.symbol, 0.0)
+    offset = source_offset * factor - target_offset
+    return Conversion(factor, offset, source, target)
+
+
+def conversion_factor(source, target):
+    # Multiplier taking a value in `source` units to `target` units. Also the
+    # right factor for uncertainties and differences of affine temperatures.
+    return compile_conversion(source, target).factor
+
+
+def convert(value, source, target):
+    return compile_conversion(source, target)(value)
+
+
+def convert_array(values, source, target, out=None):
+    # Vectorized conversion with NumPy. `source` is either one unit for every
+    # value or a sequence of units, one per value; each distinct unit is
+    # compiled once and applied with a single gather.
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    if isinstance(source, str):
+        conversion = compile_conversion(source, target)
+        if out is None:
+            out = np.empty_like(values)
+        np.multiply(values, conversion.factor, out=out)
+        if conversion.offset:
+            out += conversion.offset
+        return out
+
+    units, inverse = np.unique(np.asarray(source, dtype=object).astype(str), return_inverse=True)
+    compiled = [compile_conversion(unit, target) for unit in units]
+    factors = np.array([c.factor for c in compiled])[inverse].reshape(values.shape)
+    offsets = np.array([c.offset for c in compiled])[inverse].reshape(values.shape)
+    if out is None:
+        out = np.empty_like(values)
+    np.multiply(values, factors, out=out)
+    out += offsets
+    return out
+
+
+def compatible_units(unit):
+    # Known unprefixed symbols with the same dimensions as `unit`
+    dims = parse_unit(unit).dims
+    return [
+        symbol
+        for table in (PREFIXED_UNITS, PLAIN_UNITS)
+        for symbol, (_, symbol_dims) in table.items()
+        if symbol_dims == dims
+    ]
@@ -0,0 +1,196 @@
+import os
+import pickle
+from array import array
+from bisect import bisect_left, bisect_right
+from copy import deepcopy
+
+from files import atomic_write
+
+# Bucket widths in seconds, finest first: minute, hour, day
+LEVELS = (60, 3600, 86400)
+# A level is fine enough to draw when it has at most this many buckets per pixel
+MAX_BUCKETS_PER_PIXEL = 4
+
+
+class _Level:
+    # Event counts per fixed-width time bucket, as two parallel sorted arrays
+    __slots__ = ('width', 'keys', 'counts')
+
+    def __init__(self, width):
+        self.width = width
+        self.keys = array('q')
+        self.counts = array('d')
+
+    def add(self, timestamp, count=1):
+        key = int(timestamp // self.width)
+        keys = self.keys
+        if keys and keys[-1] == key:
+            self.counts[-1] += count
+        elif not keys or keys[-1] < key:
+            keys.append(key)
+            self.counts.append(count)
+        else:
+            # Out-of-order event (e.g. replayed from an older log)
+            i = bisect_left(keys, key)
+            if keys[i] == key:
+                self.counts[i] += count
+            else:
+                keys.insert(i, key)
+                self.counts.insert(i, count)
+
+    def span(self, start, end):
+        return (bisect_left(self.keys, int(start // self.width)),
+                bisect_right(self.keys, int(end // self.width)))
+
+
+class UsageAggregates:
+    # Multi-resolution usage counts, overall, per constant and per event kind
+    # (copy, lookup). Each event updates one bucket per level in each of its
+    # groups, so keeping the aggregates current costs O(1) per event; drawing
+    # reads the coarsest level that still has enough detail for the requested
+    # pixel width and never touches raw events.
+    def __init__(self):
+        self.total = [_Level(width) for width in LEVELS]
+        self.by_name = {}
+        self.by_kind = {}
+        self.by_name_kind = {}
+        self.last_timestamp = 0.0
+        self.events = 0
+
+    def __setstate__(self, state):
+        # Aggregates saved before events had kinds only counted copies. The
+        # copied groups get their own levels, as every group is added to.
+        if 'by_kind' not in state:
+            state['by_kind'] = {'copy': deepcopy(state['total'])} if state['events'] else {}
+            state['by_name_kind'] = {(name, 'copy'): deepcopy(levels) for name, levels in state['by_name'].items()}
+        self.__dict__.update(state)
+
+    def add(self, event):
+        groups = (
+            (self.by_name, event.name), (self.by_kind, event.kind), (self.by_name_kind, (event.name, event.kind)),
+        )
+        for level in self.total:
+            level.add(event.timestamp)
+        for groups_by_key, key in groups:
+            levels = groups_by_key.get(key)
+            if levels is None:
+                levels = groups_by_key[key] = [_Level(width) for width in LEVELS]
+            for level in levels:
+                level.add(event.timestamp)
+        self.last_timestamp = max(self.last_timestamp, event.timestamp)
+        self.events += 1
+
+    def extend(self, events):
+        for event in events:
+            self.add(event)
+
+    def names(self):
+        return list(self.by_name)
+
+    def kinds(self):
+        return list(self.by_kind)
+
+    def _levels(self, name, kind):
+        if name is None and kind is None:
+            return self.total
+        if kind is None:
+            return self.by_name.get(name)
+        if name is None:
+            return self.by_kind.get(kind)
+        return self.by_name_kind.get((name, kind))
+
+    def count(self, name=None, kind=None):
+        levels = self._levels(name, kind)
+        return int(sum(levels[-1].counts)) if levels else 0
+
+    def time_range(self, name=None, kind=None):
+        levels = self._levels(name, kind)
+        if not levels or not levels[-1].keys:
+            return None
+        finest = levels[0]
+        return finest.keys[0] * finest.width, (finest.keys[-1] + 1) * finest.width
+
+    def series(self, start, end, width, name=None, kind=None):
+        # Counts per bucket between `start` and `end`, downsampled to at most
+        # `width` columns. Returns (xs, ys) with ys as events per bucket.
+        levels = self._levels(name, kind)
+        if not levels:
+            return [], []
+        chosen = levels[-1]
+        for level in levels:
+            first, last = level.span(start, end)
+            if last - first <= width * MAX_BUCKETS_PER_PIXEL:
+                chosen = level
+                break
+        first, last = chosen.span(start, end)
+        xs = [key * chosen.width for key in chosen.keys[first:last]]
+        ys = list(chosen.counts[first:last])
+        return max_downsample(xs, ys, start, end, width)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with atomic_write(path) as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, history=None):
+        # Load saved aggregates, then replay history events newer than the save
+        try:
+            with open(path, 'rb') as file:
+                aggregates = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            aggregates = cls()
+        if history is not None:
+            since = aggregates.last_timestamp
+            aggregates.extend(event for event in history.events() if event.timestamp > since)
+        return aggregates
+
+
+def max_downsample(xs, ys, start, end, width):
+    # Min/max bucketing for counts: one point per pixel column holding the
+    # largest bucket in it, so short bursts stay visible at any zoom level
+    if len(xs) <= width or end <= start:
+        return xs, ys
+    scale = width / (end - start)
+    out_x = []
+    out_y = []
+    column = None
+    for x, y in zip(xs, ys):
+        pixel = int((x - start) * scale)
+        if pixel != column:
+            column = pixel
+            out_x.append(x)
+            out_y.append(y)
+        elif y > out_y[-1]:
+            out_y[-1] = y
+    return out_x, out_y
+
+
+def lttb(xs, ys, threshold):
+    # Largest-Triangle-Three-Buckets downsampling for line series
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(xs), list(ys)
+    out_x = [xs[0]]
+    out_y = [ys[0]]
+    bucket = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket) + 1
+        end = int((i + 1) * bucket) + 1
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        avg_x = sum(xs[end:next_end]) / max(next_end - end, 1) if end < n else xs[-1]
+        avg_y = sum(ys[end:next_end]) / max(next_end - end, 1) if end < n else ys[-1]
+        best = start
+        best_area = -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best_area = area
+                best = j
+        out_x.append(xs[best])
+        out_y.append(ys[best])
+        a = best
+    out_x.append(xs[-1])
+    out_y.append(ys[-1])
+    return out_x, out_y
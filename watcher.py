@@ -0,0 +1,250 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+
+from catalog import EXTENSION as CATALOG_EXTENSION
+from custom_io import iter_entries
+
+WATCH_EXTENSIONS = ('.json', '.jsonl', '.ndjson', '.csv', '.tsv', CATALOG_EXTENSION)
+POLL_INTERVAL_MS = 1000
+# Changes are picked up once files have been quiet for this long
+SETTLE_MS = 200
+
+# inotify(7) constants
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_EVENT = struct.Struct('iIII')
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+
+def default_paths():
+    # Catalog directory in the data dir, plus SCIENTIFIC_CONSTANTS_WATCH (os.pathsep separated)
+    from history import data_dir
+
+    paths = [os.path.join(data_dir(), 'catalogs')]
+    paths.extend(path for path in os.environ.get('SCIENTIFIC_CONSTANTS_WATCH', '').split(os.pathsep) if path)
+    return paths
+
+
+def category_for(path):
+    # Each watched file is shown as its own category, named after the file
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class _Inotify:
+    # Directory watches through libc's inotify, for Linux
+    def __init__(self, libc, fd):
+        self._libc = libc
+        self.fd = fd
+        self._directories = {}
+
+    @classmethod
+    def create(cls):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        return cls(libc, fd) if fd >= 0 else None
+
+    def watch(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return False
+        self._directories[wd] = directory
+        return True
+
+    def read(self):
+        # Paths named by pending events, or None if the kernel queue overflowed
+        paths = set()
+        while True:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                return paths
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = IN_EVENT.unpack_from(data, offset)
+                offset += IN_EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                directory = self._directories.get(wd)
+                if directory is not None and name:
+                    paths.add(os.path.join(directory, os.fsdecode(name)))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class CatalogWatcher:
+    # Reports catalog files under the watched paths (files, or directories
+    # scanned one level deep) whose size or mtime changed. With inotify only
+    # the files named by events are stat'ed; the polling fallback stats every
+    # watched file each time changes() is called.
+    def __init__(self, paths, poll=False):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self._stats = {}
+        self._inotify = None if poll else _Inotify.create()
+        if self._inotify is not None:
+            directories = {path if os.path.isdir(path) else os.path.dirname(path) for path in self.paths}
+            for directory in directories:
+                if not self._inotify.watch(directory):
+                    # A missing directory can't be watched; poll instead
+                    self._inotify.close()
+                    self._inotify = None
+                    break
+        self._first = True
+
+    def fileno(self):
+        # Readable when there are events to collect; None when polling
+        return self._inotify.fd if self._inotify is not None else None
+
+    def watches(self, path):
+        return path in self.paths or os.path.dirname(path) in self.paths and path.endswith(WATCH_EXTENSIONS)
+
+    def files(self):
+        files = set()
+        for path in self.paths:
+            if os.path.isdir(path):
+                try:
+                    names = os.listdir(path)
+                except OSError:
+                    continue
+                files.update(os.path.join(path, name) for name in names if name.endswith(WATCH_EXTENSIONS))
+            else:
+                files.add(path)
+        return files | set(self._stats)
+
+    def changes(self):
+        # Files that appeared, changed or disappeared since the last call.
+        # The first call reports every existing file.
+        if self._inotify is None or self._first:
+            candidates = self.files()
+        else:
+            candidates = self._inotify.read()
+            candidates = self.files() if candidates is None else {path for path in candidates if self.watches(path)}
+        self._first = False
+
+        changed = []
+        for path in sorted(candidates):
+            try:
+                stat = os.stat(path)
+                state = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                state = None
+            if state != self._stats.get(path):
+                changed.append(path)
+                if state is None:
+                    self._stats.pop(path, None)
+                else:
+                    self._stats[path] = state
+        return changed
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+class EntryDiff:
+    # Entry-level changes to one category: `added` and `updated` map names
+    # to {'value', 'description'}, `removed` lists names
+    __slots__ = ('category', 'added', 'updated', 'removed')
+
+    def __init__(self, category, added=None, updated=None, removed=None):
+        self.category = category
+        self.added = added or {}
+        self.updated = updated or {}
+        self.removed = removed or []
+
+    def __len__(self):
+        return len(self.added) + len(self.updated) + len(self.removed)
+
+    def summary(self):
+        return f'{len(self.added)} added, {len(self.updated)} updated, {len(self.removed)} removed'
+
+
+def diff_entries(category, old, new):
+    diff = EntryDiff(category)
+    for name, data in new.items():
+        before = old.get(name)
+        if before is None:
+            diff.added[name] = data
+        elif before != data:
+            diff.updated[name] = data
+    diff.removed = [name for name in old if name not in new]
+    return diff
+
+
+class StoreChanges:
+    # What apply_diff did, in terms views understand: record ids appended at
+    # the end of the store, rewritten in place, and retired
+    __slots__ = ('appended', 'updated', 'removed', 'new_categories')
+
+    def __init__(self):
+        self.appended = 0
+        self.updated = []
+        self.removed = []
+        self.new_categories = []
+
+
+def apply_diff(store, index, diff):
+    # Apply `diff` to the store and keep the search index in step. Must run
+    # on the thread that owns both (the GUI thread in the viewer).
+    changes = StoreChanges()
+    category = diff.category
+    if diff.added and category not in store.categories():
+        changes.new_categories.append(category)
+    for name in diff.removed:
+        record = store.remove(category, name)
+        if record is not None and not record.categories:
+            index.remove(record.id)
+            changes.removed.append(record.id)
+    for entries in (diff.updated, diff.added):
+        for name, data in entries.items():
+            old, new = store.update(category, name, data['value'], data.get('description', ''))
+            if new is old:
+                continue
+            if new.id >= len(index):
+                index.add(new)
+                changes.appended += 1
+            else:
+                index.update(new)
+                changes.updated.append(new.id)
+            if old is not None and old.id != new.id and not old.categories:
+                index.remove(old.id)
+                changes.removed.append(old.id)
+    return changes
+
+
+class CatalogSync:
+    # The last successfully parsed entries of each watched file. load() is
+    # safe to run on a worker thread; commit() records the result once the
+    # diff has been applied.
+    def __init__(self):
+        self.entries = {}
+
+    def load(self, path, cancelled=None):
+        # Parse `path` and diff it against its last committed entries.
+        # Returns (entries, diff); a deleted file diffs to nothing.
+        category = category_for(path)
+        old = self.entries.get(path, {})
+        if not os.path.exists(path):
+            return {}, diff_entries(category, old, {})
+        new = dict(iter_entries(path, cancelled=cancelled))
+        return new, diff_entries(category, old, new)
+
+    def commit(self, path, entries):
+        if entries:
+            self.entries[path] = entries
+        else:
+            self.entries.pop(path, None)
+